@@ -0,0 +1,54 @@
+"""
+Build a CACHES entry from a CACHE_URL such as locmem://, file:///path,
+redis://host:6379/0, memcached://host:11211 or dummy://.
+"""
+
+from urllib.parse import urlsplit
+
+# Longest life for entries invalidated by bumping a version key when the
+# cache is per-process, since the bump only reaches the worker that made it
+UNSHARED_TIMEOUT = 30
+
+BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "redis": "django.core.cache.backends.redis.RedisCache",
+    "rediss": "django.core.cache.backends.redis.RedisCache",
+    "memcached": "django.core.cache.backends.memcached.PyMemcacheCache",
+    "dummy": "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def cache_config(url, key_prefix="", timeout=300):
+    parts = urlsplit(url)
+    if parts.scheme not in BACKENDS:
+        raise ValueError(f"Unsupported cache URL scheme: {parts.scheme!r}")
+
+    config = {
+        "BACKEND": BACKENDS[parts.scheme],
+        "KEY_PREFIX": key_prefix,
+        "TIMEOUT": timeout,
+    }
+    if parts.scheme == "locmem":
+        config["LOCATION"] = parts.netloc or "kaumahan"
+    elif parts.scheme == "file":
+        config["LOCATION"] = parts.path
+    elif parts.scheme in ("redis", "rediss"):
+        config["LOCATION"] = url
+    elif parts.scheme == "memcached":
+        config["LOCATION"] = parts.netloc
+    return config
+
+
+def is_shared(config):
+    """True if every worker process reads and writes the same cache."""
+    return config["BACKEND"] not in (BACKENDS["locmem"], BACKENDS["dummy"])
+
+
+def versioned_timeout(timeout):
+    """``timeout`` with a shared default cache, otherwise at most UNSHARED_TIMEOUT."""
+    from django.conf import settings
+
+    if is_shared(settings.CACHES["default"]):
+        return timeout
+    return min(timeout, UNSHARED_TIMEOUT)
@@ -0,0 +1,42 @@
+"""
+DATABASES entries built from a database URL, with connection reuse tuned by
+DB_CONN_MAX_AGE, DB_CONN_HEALTH_CHECKS and DB_POOL_SIZE.
+"""
+
+import dj_database_url
+from decouple import config
+from django.core.exceptions import ImproperlyConfigured
+
+from .routers import REPLICA
+
+POOLED_ENGINE = "kaumahan.postgresql_pool"
+
+
+def database_config(url, conn_max_age=None, health_checks=None, pool_size=None):
+    if conn_max_age is None:
+        conn_max_age = config("DB_CONN_MAX_AGE", default=60, cast=int)
+    if health_checks is None:
+        health_checks = config("DB_CONN_HEALTH_CHECKS", default=True, cast=bool)
+    if pool_size is None:
+        pool_size = config("DB_POOL_SIZE", default=0, cast=int)
+    # A pooled connection goes back to the pool at the end of every request
+    db_config = dj_database_url.parse(
+        url,
+        conn_max_age=0 if pool_size else conn_max_age,
+        conn_health_checks=health_checks,
+    )
+    if pool_size:
+        if db_config["ENGINE"] != "django.db.backends.postgresql":
+            raise ImproperlyConfigured("DB_POOL_SIZE is only supported for PostgreSQL")
+        db_config["ENGINE"] = POOLED_ENGINE
+        db_config["POOL_SIZE"] = pool_size
+    return db_config
+
+
+def replica_databases():
+    """The DATABASES entry for DATABASE_REPLICA_URL, or nothing when unset."""
+    url = config("DATABASE_REPLICA_URL", default="")
+    if not url:
+        return {}
+    # Tests read the replica through the test database's own connection
+    return {REPLICA: {**database_config(url), "TEST": {"MIRROR": "default"}}}
@@ -0,0 +1,78 @@
+"""
+PostgreSQL backend that parks closed connections in a per-process pool of
+up to POOL_SIZE idle connections, pinging ones idle for POOL_CHECK_AFTER.
+"""
+
+import os
+import queue
+import threading
+import time
+
+from django.db import DatabaseError
+from django.db.backends.postgresql import base
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(alias, size):
+    key = (os.getpid(), alias)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = queue.LifoQueue(maxsize=size)
+    return pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _get_pool(self):
+        return _pool(self.alias, self.settings_dict["POOL_SIZE"])
+
+    def get_new_connection(self, conn_params):
+        pool = self._get_pool()
+        check_after = self.settings_dict.get("POOL_CHECK_AFTER", 30)
+        while True:
+            try:
+                connection, returned_at = pool.get_nowait()
+            except queue.Empty:
+                return super().get_new_connection(conn_params)
+            if connection.closed:
+                continue
+            if time.monotonic() - returned_at > check_after and not self._ping(connection):
+                continue
+            # get_new_connection() normally records this while connecting
+            self.isolation_level = base.IsolationLevel(
+                self.settings_dict["OPTIONS"].get(
+                    "isolation_level", base.IsolationLevel.READ_COMMITTED
+                )
+            )
+            return connection
+
+    def _ping(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+        except self.Database.Error:
+            try:
+                connection.close()
+            except self.Database.Error:
+                pass
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self.connection.closed or (self.errors_occurred and not self.is_usable()):
+            return super()._close()
+        if self.in_atomic_block:
+            # Closed inside atomic(): Django keeps the connection on this
+            # wrapper until the block exits, so pooling it would share it.
+            return super()._close()
+        try:
+            with self.wrap_database_errors:
+                self.connection.rollback()
+            self._get_pool().put_nowait((self.connection, time.monotonic()))
+        except (DatabaseError, queue.Full):
+            return super()._close()
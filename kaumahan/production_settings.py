@@ -7,11 +7,12 @@ SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-fallback-key-12345')
 
 # PostgreSQL Database - Ensure PostgreSQL is used in production
 import dj_database_url
+from .db import database_config, replica_databases
 
 # First try DATABASE_URL from environment
 if 'DATABASE_URL' in os.environ:
     DATABASES = {
-        'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
+        'default': database_config(os.environ.get('DATABASE_URL'))
     }
     print(f"✅ Using PostgreSQL from DATABASE_URL: {os.environ.get('DATABASE_URL')}")
 else:
@@ -24,6 +25,9 @@ else:
     }
     print("⚠️ WARNING: No DATABASE_URL found, using SQLite fallback")
 
+# Optional read replica for reporting reads (see kaumahan/routers.py)
+DATABASES.update(replica_databases())
+
 # Ensure we're not accidentally using SQLite in production
 if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
     print("🚨 CRITICAL: Using SQLite in production! Data will be lost!")
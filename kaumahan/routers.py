@@ -0,0 +1,96 @@
+"""
+Send opted-in reporting reads to the DATABASE_REPLICA_URL read replica,
+keeping a visitor on the primary for a while after they write.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+REPLICA = "replica"
+STICKY_COOKIE = "primary_until"
+
+_reporting = ContextVar("reporting", default=False)
+# Per-request flags; a dict so the router can update it from inside the view
+_request_state = ContextVar("replica_request_state", default=None)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def reporting():
+    """Let reads inside the block use the replica."""
+    token = _reporting.set(True)
+    try:
+        yield
+    finally:
+        _reporting.reset(token)
+
+
+def reads_from_replica(view):
+    """
+    Run a view's GET/HEAD requests in :func:`reporting` mode. Lazy
+    responses are rendered inside the block so their queries are covered.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return view(request, *args, **kwargs)
+        with reporting():
+            response = view(request, *args, **kwargs)
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+        return response
+    return wrapped
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _reporting.get() or not replica_configured():
+            return None
+        state = _request_state.get()
+        if state is not None and (state["sticky"] or state["wrote"]):
+            return None
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state["wrote"] = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db == REPLICA else None
+
+
+class StickyPrimaryMiddleware:
+    """Keep a visitor's reporting reads on the primary for a while after they write."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = {"sticky": STICKY_COOKIE in request.COOKIES, "wrote": False}
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        if state["wrote"] and replica_configured():
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=getattr(settings, "REPLICA_STICKY_SECONDS", 15),
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -2,6 +2,9 @@ from pathlib import Path
 
 from decouple import config
 
+from .cache import cache_config, is_shared
+from .db import database_config, replica_databases
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -30,12 +33,14 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    "marketplace.instrumentation.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "kaumahan.routers.StickyPrimaryMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
@@ -62,13 +67,14 @@ TEMPLATES = [
 WSGI_APPLICATION = "kaumahan.wsgi.application"
 
 
-import dj_database_url
 import os
 
 # Database configuration
+# DB_CONN_MAX_AGE, DB_CONN_HEALTH_CHECKS and DB_POOL_SIZE tune connection
+# reuse (see kaumahan/db.py)
 if os.environ.get('DATABASE_URL'):
     DATABASES = {
-        'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
+        'default': database_config(os.environ.get('DATABASE_URL'))
     }
 else:
     # Local development with SQLite
@@ -79,6 +85,11 @@ else:
         }
     }
 
+# Optional read replica for reporting reads (see kaumahan/routers.py)
+DATABASES.update(replica_databases())
+DATABASE_ROUTERS = ['kaumahan.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=15, cast=int)
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -129,6 +140,10 @@ else:
     MEDIA_ROOT = os.environ.get('RENDER_PERSISTENT_DISK_PATH', '/media') 
     DEFAULT_FILE_STORAGE = 'kaumahan.storage.RenderProductionStorage'
 
+# Store uploads once per distinct content under products/ab/cd/<sha256>.<ext>
+if config("MEDIA_CONTENT_ADDRESSED", default=False, cast=bool):
+    DEFAULT_FILE_STORAGE = 'kaumahan.storage.ContentAddressedStorage'
+
 # Ensure media directory exists
 import os
 if not os.path.exists(MEDIA_ROOT):
@@ -137,11 +152,58 @@ if not os.path.exists(MEDIA_ROOT):
 # Additional media settings
 MEDIA_UPLOAD_TO = "products/"  # Default upload path for products
 
+# Let the front-end server send media files: "X-Sendfile" (Apache, lighttpd)
+# or "X-Accel-Redirect" (nginx, with an internal location at the prefix).
+# Empty means Django streams them itself.
+MEDIA_SENDFILE_HEADER = config("MEDIA_SENDFILE_HEADER", default="")
+MEDIA_SENDFILE_PREFIX = config("MEDIA_SENDFILE_PREFIX", default="/protected-media/")
+
+# Browser cache lifetime for media that isn't content-addressed (seconds)
+MEDIA_CACHE_MAX_AGE = config("MEDIA_CACHE_MAX_AGE", default=3600, cast=int)
+
+# Cache backend, e.g. "locmem://", "file:///var/tmp/kaumahan" or
+# "redis://localhost:6379/0" (see kaumahan/cache.py)
+CACHES = {
+    "default": cache_config(
+        config("CACHE_URL", default="locmem://"),
+        key_prefix=config("CACHE_KEY_PREFIX", default="kaumahan"),
+    ),
+}
+
+# How long anonymous renders of the public pages are reused (seconds)
+PAGE_CACHE_SECONDS = config("PAGE_CACHE_SECONDS", default=600, cast=int)
+
+# Request instrumentation (see marketplace/instrumentation.py)
+SERVER_TIMING_HEADER = config("SERVER_TIMING_HEADER", default=True, cast=bool)
+SLOW_REQUEST_MS = config("SLOW_REQUEST_MS", default=500, cast=int)
+SLOW_REQUEST_QUERIES = config("SLOW_REQUEST_QUERIES", default=50, cast=int)
+REPEATED_QUERY_LIMIT = config("REPEATED_QUERY_LIMIT", default=10, cast=int)
+
+# Prometheus scrapes of /metrics send "Authorization: Bearer <METRICS_TOKEN>";
+# METRICS_DIR holds each worker's counters (see marketplace/metrics.py)
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+METRICS_DIR = config("METRICS_DIR", default="")
+
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "marketplace.CustomUser"
 
+# Signed-in users are loaded from the cache (see marketplace/backends.py).
+# ModelBackend stays listed so sessions created before the switch remain valid.
+AUTHENTICATION_BACKENDS = [
+    "marketplace.backends.CachedModelBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+# Only with a cache all workers share: a per-process cache can't be
+# invalidated everywhere when a user is changed
+USER_CACHE = config("USER_CACHE", default=is_shared(CACHES["default"]), cast=bool)
+USER_CACHE_SECONDS = config("USER_CACHE_SECONDS", default=300, cast=int)
+
+# "django.contrib.sessions.backends.cached_db" reads sessions from the
+# cache and writes them through to the database
+SESSION_ENGINE = config("SESSION_ENGINE", default="django.contrib.sessions.backends.db")
+
 LOGIN_URL = "login"
 LOGOUT_REDIRECT_URL = "home"
 
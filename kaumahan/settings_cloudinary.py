@@ -14,12 +14,17 @@ SECRET_KEY = config("SECRET_KEY")
 DEBUG = config("DEBUG", default=False, cast=bool)
 ALLOWED_HOSTS = config("ALLOWED_HOSTS", default="*.onrender.com").split(",")
 
-# DATABASE (PostgreSQL on Render)
-import dj_database_url
+# DATABASE (PostgreSQL on Render); DB_CONN_MAX_AGE, DB_CONN_HEALTH_CHECKS
+# and DB_POOL_SIZE tune connection reuse (see kaumahan/db.py)
+from .db import database_config, replica_databases
 DATABASES = {
-    'default': dj_database_url.parse(config('DATABASE_URL'))
+    'default': database_config(config('DATABASE_URL'))
 }
 
+# Optional read replica for reporting reads (see kaumahan/routers.py)
+DATABASES.update(replica_databases())
+DATABASE_ROUTERS = ['kaumahan.routers.ReplicaRouter']
+
 # INSTALLED APPS
 INSTALLED_APPS = [
     "django.contrib.admin",
@@ -39,12 +44,14 @@ INSTALLED_APPS = [
 
 # MIDDLEWARE
 MIDDLEWARE = [
+    "marketplace.instrumentation.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "kaumahan.routers.StickyPrimaryMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -116,6 +123,11 @@ LOGOUT_REDIRECT_URL = "home"
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Prometheus scrapes of /metrics send "Authorization: Bearer <METRICS_TOKEN>";
+# METRICS_DIR holds each worker's counters (see marketplace/metrics.py)
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+METRICS_DIR = config("METRICS_DIR", default="")
+
 # EMAIL
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL", default="admin@kaumahan.local")
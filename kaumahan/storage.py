@@ -3,7 +3,11 @@ Custom storage backend for Render Persistent Disk
 Ensures persistent media file storage in production
 """
 
+import hashlib
 import os
+import re
+import tempfile
+
 from django.core.files.storage import FileSystemStorage
 from django.conf import settings
 
@@ -76,3 +80,98 @@ class RenderProductionStorage(RenderPersistentStorage):
                 )
         
         super().__init__(**kwargs)
+
+
+_SHARD_SUFFIX = re.compile(r"(^|/)[0-9a-f]{2}/[0-9a-f]{2}$")
+
+
+class ContentAddressedStorage(RenderProductionStorage):
+    """
+    Stores each distinct file once, under the SHA-256 of its content.
+
+    Uploads are hashed while they are streamed to a temporary file, then
+    moved to ``<upload dir>/ab/cd/<sha256>.<ext>``. When that blob already
+    exists, the new copy is dropped and the existing one is reused. A
+    ``MediaBlob`` row counts the references to each blob. ``delete()``
+    decrements the count and only removes the file once nothing uses it.
+
+    Names never change content, so these files can be cached forever (see
+    marketplace.media). Names that aren't content-addressed, such as
+    uploads from before this storage was enabled, keep the plain
+    filesystem behaviour.
+    """
+
+    reference_counted = True
+    chunk_size = 64 * 1024
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content hash in _save(), so there is
+        # nothing to probe for.
+        return name
+
+    def blob_name(self, name, digest):
+        directory, filename = os.path.split(name.replace(os.sep, "/"))
+        # Names derived from a stored blob (e.g. resized copies) already sit
+        # in its shard directories; keep them in the same tree.
+        directory = _SHARD_SUFFIX.sub("", directory)
+        extension = os.path.splitext(filename)[1].lower()
+        return "/".join(
+            part for part in (directory, digest[:2], digest[2:4], f"{digest}{extension}") if part
+        )
+
+    def _save(self, name, content):
+        from django.db import IntegrityError, transaction
+        from django.db.models import F
+
+        from marketplace.models import MediaBlob
+
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.location, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as temp:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks(self.chunk_size):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    temp.write(chunk)
+
+            name = self.blob_name(name, digest.hexdigest())
+            full_path = self.path(name)
+            with transaction.atomic():
+                # Take the reference first: the write locks the blob row (the
+                # whole database on SQLite), so a concurrent delete can't
+                # remove the file between the existence check and the move.
+                if not MediaBlob.objects.filter(name=name).update(refcount=F("refcount") + 1):
+                    try:
+                        with transaction.atomic():
+                            MediaBlob.objects.create(name=name, size=size, refcount=1)
+                    except IntegrityError:
+                        # Another upload of the same content created it first
+                        MediaBlob.objects.filter(name=name).update(refcount=F("refcount") + 1)
+                if not os.path.exists(full_path):
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    os.replace(temp_path, full_path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(full_path, self.file_permissions_mode)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+    def delete(self, name):
+        from django.db import transaction
+        from django.db.models import F
+
+        from marketplace.models import MediaBlob
+
+        if not name:
+            return
+        with transaction.atomic():
+            if not MediaBlob.objects.filter(name=name).update(refcount=F("refcount") - 1):
+                # Not tracked (e.g. uploaded before content addressing)
+                return super().delete(name)
+            deleted, _ = MediaBlob.objects.filter(name=name, refcount=0).delete()
+            if deleted:
+                super().delete(name)
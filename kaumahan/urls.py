@@ -2,14 +2,16 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
-from django.views.static import serve
 from django.urls import re_path
 
+from marketplace import media, metrics
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("pages.urls")),
     path("marketplace/", include("marketplace.urls")),
+    path("metrics", metrics.metrics_view, name="metrics"),
     path("__debug__/", include("debug_toolbar.urls")),
 ]
 
@@ -19,9 +21,9 @@ if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 else:
-    # Production: Serve media files with proper caching headers
+    # Production: Stream media files with validators and Cache-Control
     urlpatterns += [
-        re_path(r'^media/(?P<path>.*)$', serve, {
+        re_path(r'^media/(?P<path>.*)$', media.serve, {
             'document_root': settings.MEDIA_ROOT,
         }),
     ]
@@ -1,13 +1,34 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
+from django.utils import timezone
 from django.utils.html import format_html
 from django.db.models import Avg
 
-from .models import CartItem, CustomUser, Order, OrderItem, Product, RatingReview
+from kaumahan.routers import reads_from_replica
 
+from . import backends, inventory, ratings
+from .forms import StockEditForm
+from .models import (
+    CartItem,
+    CustomUser,
+    DailyMarketStats,
+    Job,
+    Order,
+    OrderItem,
+    Product,
+    RatingReview,
+)
 
-class CustomUserAdmin(BaseUserAdmin):
+
+class ReplicaChangeListMixin:
+    """Changelists are reports: serve their GETs from the read replica."""
+
+    def changelist_view(self, request, extra_context=None):
+        return reads_from_replica(super().changelist_view)(request, extra_context)
+
+
+class CustomUserAdmin(ReplicaChangeListMixin, BaseUserAdmin):
     model = CustomUser
     list_display = ("email", "full_name", "user_type", "is_approved", "is_staff", "date_joined")
     list_filter = ("user_type", "is_approved", "is_staff", "date_joined")
@@ -19,21 +40,25 @@ class CustomUserAdmin(BaseUserAdmin):
     
     def approve_sellers(self, request, queryset):
         queryset.filter(user_type='seller').update(is_approved=True)
+        backends.forget_users(queryset.values_list('pk', flat=True))
         self.message_user(request, "Selected sellers have been approved.")
     approve_sellers.short_description = "Approve selected sellers"
     
     def disapprove_sellers(self, request, queryset):
         queryset.filter(user_type='seller').update(is_approved=False)
+        backends.forget_users(queryset.values_list('pk', flat=True))
         self.message_user(request, "Selected sellers have been disapproved.")
     disapprove_sellers.short_description = "Disapprove selected sellers"
     
     def make_staff(self, request, queryset):
         queryset.update(is_staff=True)
+        backends.forget_users(queryset.values_list('pk', flat=True))
         self.message_user(request, "Selected users are now staff.")
     make_staff.short_description = "Make selected users staff"
     
     def remove_staff(self, request, queryset):
         queryset.update(is_staff=False)
+        backends.forget_users(queryset.values_list('pk', flat=True))
         self.message_user(request, "Staff privileges removed from selected users.")
     remove_staff.short_description = "Remove staff privileges"
 
@@ -86,7 +111,7 @@ class OrderItemInline(admin.TabularInline):
         return f"₱{obj.price}" if obj.price else "N/A"
 
 
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ("id", "buyer", "seller", "status", "total_amount", "item_count", "created_at")
     list_filter = ("status", "created_at", "buyer", "seller")
     search_fields = ("buyer__email", "buyer__full_name", "seller__email", "seller__full_name")
@@ -113,11 +138,13 @@ class OrderAdmin(admin.ModelAdmin):
     
     def mark_delivered(self, request, queryset):
         queryset.update(status='DELIVERED')
+        inventory.settle_orders(queryset)
         self.message_user(request, "Orders marked as delivered.")
     mark_delivered.short_description = "Mark as delivered"
     
     def mark_cancelled(self, request, queryset):
         queryset.update(status='CANCELLED')
+        inventory.settle_orders(queryset)
         self.message_user(request, "Orders marked as cancelled.")
     mark_cancelled.short_description = "Mark as cancelled"
     
@@ -126,11 +153,18 @@ class OrderAdmin(admin.ModelAdmin):
     item_count.short_description = "Items"
 
 
-class ProductAdmin(admin.ModelAdmin):
-    list_display = ("name", "seller", "price", "category", "unit", "is_active", "rating_display", "created_at")
+class ProductAdminForm(StockEditForm):
+    class Meta:
+        model = Product
+        fields = "__all__"
+
+
+class ProductAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    form = ProductAdminForm
+    list_display = ("name", "seller", "price", "category", "unit", "stock", "is_active", "rating_display", "created_at")
     list_filter = ("category", "is_active", "unit", "created_at", "seller")
     search_fields = ("name", "description", "seller__email", "seller__full_name")
-    readonly_fields = ("created_at", "updated_at", "rating_display", "image_preview")
+    readonly_fields = ("created_at", "updated_at", "rating_display", "image_preview", "reserved_quantity")
     
     # Add custom actions
     actions = ['activate_products', 'deactivate_products', 'featured_products']
@@ -155,10 +189,16 @@ class ProductAdmin(admin.ModelAdmin):
     
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="100" height="100" style="object-fit: cover;" />', obj.image.url)
+            return format_html('<img src="{}" width="100" height="100" style="object-fit: cover;" />', obj.image_variant_url(160))
         return "No image"
     image_preview.short_description = "Image Preview"
     
+    def save_model(self, request, obj, form, change):
+        if change:
+            form.save_product(obj)
+        else:
+            super().save_model(request, obj, form, change)
+    
     fieldsets = (
         ("Basic Information", {
             "fields": ("name", "description", "seller")
@@ -166,6 +206,9 @@ class ProductAdmin(admin.ModelAdmin):
         ("Pricing & Category", {
             "fields": ("price", "category", "unit")
         }),
+        ("Inventory", {
+            "fields": ("stock", "stock_seen", "reserved_quantity")
+        }),
         ("Media", {
             "fields": ("image", "image_preview")
         }),
@@ -179,7 +222,7 @@ class ProductAdmin(admin.ModelAdmin):
     )
 
 
-class RatingReviewAdmin(admin.ModelAdmin):
+class RatingReviewAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ("product", "buyer", "rating_display", "is_approved", "created_at")
     list_filter = ("rating", "is_approved", "created_at")
     search_fields = ("product__name", "buyer__email", "buyer__full_name", "comment")
@@ -189,12 +232,16 @@ class RatingReviewAdmin(admin.ModelAdmin):
     actions = ['approve_reviews', 'disapprove_reviews']
     
     def approve_reviews(self, request, queryset):
+        product_ids = set(queryset.values_list("product_id", flat=True))
         queryset.update(is_approved=True)
+        ratings.recalculate(product_ids)
         self.message_user(request, "Selected reviews have been approved.")
     approve_reviews.short_description = "Approve selected reviews"
     
     def disapprove_reviews(self, request, queryset):
+        product_ids = set(queryset.values_list("product_id", flat=True))
         queryset.update(is_approved=False)
+        ratings.recalculate(product_ids)
         self.message_user(request, "Selected reviews have been disapproved.")
     disapprove_reviews.short_description = "Disapprove selected reviews"
     
@@ -204,7 +251,7 @@ class RatingReviewAdmin(admin.ModelAdmin):
     rating_display.short_description = "Rating"
 
 
-class CartItemAdmin(admin.ModelAdmin):
+class CartItemAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ("buyer", "product", "quantity", "created_at")
     list_filter = ("created_at", "buyer")
     search_fields = ("buyer__email", "buyer__full_name", "product__name")
@@ -220,12 +267,49 @@ class CartItemAdmin(admin.ModelAdmin):
     clear_cart_items.short_description = "Clear selected cart items"
 
 
+class DailyMarketStatsAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    list_display = ("date", "orders", "revenue", "new_buyers", "new_sellers", "new_reviews", "computed_at")
+    date_hierarchy = "date"
+    readonly_fields = (
+        "date", "orders", "revenue", "new_buyers", "new_sellers",
+        "new_reviews", "category_counts", "computed_at",
+    )
+
+    def has_add_permission(self, request):
+        # Rows are written by the rollup_stats management command.
+        return False
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "attempts", "run_at", "finished_at", "locked_by")
+    list_filter = ("status", "kind")
+    search_fields = ("kind", "last_error")
+    readonly_fields = (
+        "kind", "payload", "status", "attempts", "max_attempts", "run_at",
+        "locked_by", "locked_at", "last_error", "created_at", "finished_at",
+    )
+    actions = ["retry_jobs"]
+
+    def has_add_permission(self, request):
+        # Jobs are queued by the application (marketplace.jobs.enqueue).
+        return False
+
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status="running").update(
+            status="queued", attempts=0, run_at=timezone.now(), finished_at=None
+        )
+        self.message_user(request, f"{updated} jobs queued to run again.")
+    retry_jobs.short_description = "Run selected jobs again"
+
+
 # Register all admin classes
 admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(Product, ProductAdmin)
 admin.site.register(CartItem, CartItemAdmin)
 admin.site.register(Order, OrderAdmin)
 admin.site.register(RatingReview, RatingReviewAdmin)
+admin.site.register(DailyMarketStats, DailyMarketStatsAdmin)
+admin.site.register(Job, JobAdmin)
 
 # Customize admin site
 admin.site.site_header = "Kaumahan Harvest Market Administration"
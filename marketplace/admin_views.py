@@ -1,44 +1,30 @@
 from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
-from django.db.models import Count, Sum, Avg
-from django.utils.timezone import now, timedelta
+from django.db.models import Count, Sum
+from django.utils.timezone import localdate, timedelta
 from django.http import JsonResponse
-from .models import Product, CustomUser, Order, RatingReview, CartItem
+from kaumahan.routers import reads_from_replica
+from . import instrumentation, queries
+from .models import Product, CustomUser, Order, RatingReview
+from .stats import (
+    GRANULARITIES,
+    DashboardStats,
+    add_months,
+    month_start,
+    order_series,
+    signup_series,
+)
+
+MAX_CHART_DAYS = 730
+MAX_CHART_MONTHS = 60
 
 
 @staff_member_required
+@reads_from_replica
 def admin_dashboard(request):
     """Enhanced admin dashboard with comprehensive statistics"""
     
-    # Time periods
-    today = now().date()
-    this_month_start = today.replace(day=1)
-    last_month_start = (this_month_start - timedelta(days=1)).replace(day=1)
-    last_month_end = this_month_start - timedelta(days=1)
-    
-    # User Statistics
-    total_users = CustomUser.objects.count()
-    total_sellers = CustomUser.objects.filter(user_type='seller').count()
-    total_buyers = CustomUser.objects.filter(user_type='buyer').count()
-    approved_sellers = CustomUser.objects.filter(user_type='seller', is_approved=True).count()
-    pending_sellers = CustomUser.objects.filter(user_type='seller', is_approved=False).count()
-    
-    # Product Statistics
-    total_products = Product.objects.count()
-    active_products = Product.objects.filter(is_active=True).count()
-    inactive_products = Product.objects.filter(is_active=False).count()
-    
-    # Order Statistics
-    total_orders = Order.objects.count()
-    orders_this_month = Order.objects.filter(created_at__gte=this_month_start).count()
-    orders_last_month = Order.objects.filter(created_at__gte=last_month_start, created_at__lt=last_month_end).count()
-    
-    # Revenue Statistics
-    total_revenue = Order.objects.filter(status='DELIVERED').aggregate(total=Sum('total_amount'))['total'] or 0
-    revenue_this_month = Order.objects.filter(
-        status='DELIVERED', 
-        created_at__gte=this_month_start
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
+    stats = DashboardStats()
     
     # Recent Orders
     recent_orders = Order.objects.select_related('buyer', 'seller').order_by('-created_at')[:10]
@@ -60,40 +46,9 @@ def admin_dashboard(request):
     # Recent Reviews
     recent_reviews = RatingReview.objects.select_related('product', 'buyer').order_by('-created_at')[:10]
     
-    # Pending Reviews
-    pending_reviews = RatingReview.objects.filter(is_approved=False).count()
-    
-    # Cart Statistics
-    active_carts = CartItem.objects.values('user').distinct().count()
-    total_cart_items = CartItem.objects.count()
-    
     context = {
         'page_title': 'Admin Dashboard',
-        
-        # User Stats
-        'total_users': total_users,
-        'total_sellers': total_sellers,
-        'total_buyers': total_buyers,
-        'approved_sellers': approved_sellers,
-        'pending_sellers': pending_sellers,
-        'seller_approval_rate': (approved_sellers / total_sellers * 100) if total_sellers > 0 else 0,
-        
-        # Product Stats
-        'total_products': total_products,
-        'active_products': active_products,
-        'inactive_products': inactive_products,
-        'product_activation_rate': (active_products / total_products * 100) if total_products > 0 else 0,
-        
-        # Order Stats
-        'total_orders': total_orders,
-        'orders_this_month': orders_this_month,
-        'orders_last_month': orders_last_month,
-        'order_growth': ((orders_this_month - orders_last_month) / orders_last_month * 100) if orders_last_month > 0 else 0,
-        
-        # Revenue Stats
-        'total_revenue': total_revenue,
-        'revenue_this_month': revenue_this_month,
-        'avg_order_value': (total_revenue / total_orders) if total_orders > 0 else 0,
+        **stats.as_context(),
         
         # Recent Data
         'recent_orders': recent_orders,
@@ -101,59 +56,71 @@ def admin_dashboard(request):
         'top_sellers': top_sellers,
         'recent_reviews': recent_reviews,
         
-        # Other Stats
-        'pending_reviews': pending_reviews,
-        'active_carts': active_carts,
-        'total_cart_items': total_cart_items,
-        
         # Quick Actions
-        'pending_sellers_list': CustomUser.objects.filter(user_type='seller', is_approved=False)[:5],
-        'pending_reviews_list': RatingReview.objects.filter(is_approved=False)[:5],
+        'pending_sellers_list': queries.pending_sellers()[:5],
+        'pending_reviews_list': queries.pending_reviews()[:5],
     }
     
     return render(request, 'admin/dashboard.html', context)
 
 
 @staff_member_required
+@reads_from_replica
 def admin_chart_data(request):
-    """Provide data for admin charts"""
-    
-    # Get last 30 days order data
-    end_date = now().date()
-    start_date = end_date - timedelta(days=30)
-    
-    orders_by_day = []
-    for i in range(30):
-        date = start_date + timedelta(days=i)
-        order_count = Order.objects.filter(created_at__date=date).count()
-        orders_by_day.append({
-            'date': date.strftime('%Y-%m-%d'),
-            'orders': order_count
-        })
+    """
+    Provide data for admin charts.
+
+    Query parameters: ``days`` (order history length, default 30),
+    ``granularity`` (``day``, ``week`` or ``month``) and ``months`` (user
+    growth history, default 12). Series read the DailyMarketStats rollup and
+    only query live tables for days it does not cover yet.
+    """
+    granularity = request.GET.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return JsonResponse({'error': 'granularity must be day, week or month'}, status=400)
+    try:
+        days = min(max(int(request.GET.get('days', 30)), 1), MAX_CHART_DAYS)
+        months = min(max(int(request.GET.get('months', 12)), 1), MAX_CHART_MONTHS)
+    except ValueError:
+        return JsonResponse({'error': 'days and months must be integers'}, status=400)
+    
+    end_date = localdate()
+    
+    # Orders per bucket over the requested range
+    orders = order_series(end_date - timedelta(days=days - 1), end_date, granularity)
+    orders_by_day = [
+        {'date': row['bucket'].strftime('%Y-%m-%d'), 'orders': row['count']}
+        for row in orders
+    ]
     
     # Category distribution
     category_data = Product.objects.values('category').annotate(
         count=Count('id')
     ).order_by('-count')
     
-    # User growth
-    user_growth = []
-    for i in range(12):  # Last 12 months
-        month_start = (end_date.replace(day=1) - timedelta(days=30*i)).replace(day=1)
-        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        user_count = CustomUser.objects.filter(
-            date_joined__gte=month_start,
-            date_joined__lte=month_end
-        ).count()
-        user_growth.append({
-            'month': month_start.strftime('%Y-%m'),
-            'users': user_count
-        })
+    # User growth per calendar month
+    first_month = add_months(month_start(end_date), -(months - 1))
+    users = signup_series(first_month, end_date, 'month')
+    user_growth = [
+        {'month': row['bucket'].strftime('%Y-%m'), 'users': row['count']}
+        for row in users
+    ]
     
     data = {
+        'granularity': granularity,
         'orders_by_day': orders_by_day,
         'category_data': list(category_data),
-        'user_growth': list(reversed(user_growth)),
+        'user_growth': user_growth,
     }
     
     return JsonResponse(data)
+
+
+@staff_member_required
+def admin_request_stats(request):
+    """
+    Rolling per-view latency and query-count percentiles for the process
+    that answers the request (see marketplace.instrumentation). With
+    several workers, each reports only its own traffic.
+    """
+    return JsonResponse({'views': instrumentation.snapshot()})
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MarketplaceConfig(AppConfig):
     name = "marketplace"
     verbose_name = "Kaumahan Marketplace"
+
+    def ready(self):
+        from . import signals  # noqa: F401
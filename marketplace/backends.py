@@ -0,0 +1,31 @@
+"""
+Authentication backend that loads signed-in users from a shared cache.
+"""
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from . import metrics
+
+
+def _cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def forget_users(user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        if not getattr(settings, "USER_CACHE", False):
+            return super().get_user(user_id)
+        key = _cache_key(user_id)
+        user = cache.get(key)
+        metrics.CACHE_LOOKUPS.inc(cache="user", result="miss" if user is None else "hit")
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, getattr(settings, "USER_CACHE_SECONDS", 300))
+        return user
@@ -3,6 +3,7 @@ from django.contrib.auth import authenticate
 from django.contrib.auth import get_user_model
 import os
 
+from . import inventory
 from .models import CartItem, Order, Product, RatingReview
 
 
@@ -89,11 +90,48 @@ class LoginForm(forms.Form):
         return self.user_cache
 
 
-class ProductForm(forms.ModelForm):
+class StockEditForm(forms.ModelForm):
+    """Product form that saves an edited stock figure as a delta."""
+
+    # The stock figure the form was rendered with, so an edit is saved as a
+    # change to it and checkouts made meanwhile aren't overwritten
+    stock_seen = forms.IntegerField(required=False, widget=forms.HiddenInput())
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['stock_seen'].initial = self.initial.get('stock')
+
+    def save(self, commit=True):
+        if not commit or self.instance._state.adding:
+            return super().save(commit)
+        product = super().save(commit=False)
+        self.save_product(product)
+        return product
+
+    def save_product(self, product):
+        """Update an existing product: every field but stock, then the stock delta."""
+        fields = [
+            field.name for field in product._meta.concrete_fields
+            if field.name in self.fields and field.name != 'stock'
+        ]
+        product.save(update_fields=fields + ['updated_at'])
+        if 'stock_seen' in self.data:
+            seen = self.cleaned_data['stock_seen']
+        else:
+            seen = self.initial.get('stock')
+        inventory.apply_stock_edit(product, seen, self.cleaned_data['stock'])
+
+
+class ProductForm(StockEditForm):
     class Meta:
         model = Product
-        fields = ["name", "description", "price", "unit", "category", "image"]
+        fields = ["name", "description", "price", "unit", "category", "stock", "image"]
         widgets = {
+            'stock': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': '0',
+                'style': 'max-width: 200px;',
+            }),
             'unit': forms.Select(attrs={
                 'class': 'form-select',
                 'style': 'max-width: 200px;',
@@ -106,6 +144,7 @@ class ProductForm(forms.ModelForm):
         }
         labels = {
             'unit': 'Unit of Measurement',
+            'stock': 'Stock on Hand (Optional)',
             'image': 'Product Image (Optional)',
         }
 
@@ -131,12 +170,12 @@ class ProductForm(forms.ModelForm):
                     f"Invalid file type. Allowed types: {', '.join(valid_extensions)}"
                 )
             
-            # Additional validation using PIL
+            # Cheap header check only; the full decode (verify()) and resizing
+            # run in the background "images.process_upload" job
             try:
                 from PIL import Image
-                img = Image.open(image)
-                img.verify()  # Verify it's a valid image
-                image.seek(0)  # Reset file pointer after verification
+                Image.open(image)
+                image.seek(0)
             except Exception:
                 raise forms.ValidationError("Invalid image file. Please upload a valid image.")
         
@@ -0,0 +1,35 @@
+"""
+Keys for cached product card fragments, built from the columns a card
+shows plus a global version for everything else.
+"""
+
+from django.core.cache import cache
+
+from kaumahan.cache import versioned_timeout
+
+
+_CARD_VERSION_KEY = "fragments:product-card:version"
+CARD_CACHE_SECONDS = 24 * 60 * 60
+
+
+def card_timeout():
+    """Fragment lifetime; short when the version bump can't reach every worker."""
+    return versioned_timeout(CARD_CACHE_SECONDS)
+
+
+def card_version():
+    return cache.get_or_set(_CARD_VERSION_KEY, 1, timeout=None)
+
+
+def invalidate_cards():
+    """Make every cached product card stale."""
+    try:
+        cache.incr(_CARD_VERSION_KEY)
+    except ValueError:
+        cache.set(_CARD_VERSION_KEY, 1, timeout=None)
+
+
+def card_key(product, version):
+    updated = product.updated_at.timestamp() if product.updated_at else ""
+    source = (product.image_variants or {}).get("source") or ""
+    return f"{version}:{product.pk}:{updated}:{product.rating_count}:{product.rating_sum}:{source}"
@@ -0,0 +1,74 @@
+"""
+Idempotency keys, so a replayed checkout POST returns the original order.
+"""
+
+import re
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError
+from django.utils.timezone import now
+
+from .models import IdempotencyKey
+
+
+FORM_FIELD = "idempotency_key"
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+KEY_TTL = timedelta(hours=24)
+
+_VALID_KEY = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+class DuplicateRequest(Exception):
+    pass
+
+
+def new_key() -> str:
+    return uuid.uuid4().hex
+
+
+def key_from_request(request):
+    """The key sent with ``request``, or None if missing or malformed."""
+    key = request.META.get(HEADER) or request.POST.get(FORM_FIELD)
+    if key and _VALID_KEY.match(key):
+        return key
+    return None
+
+
+def replay(user, key):
+    """The redirect URL of a finished request with this key, if any."""
+    if not key:
+        return None
+    record = (
+        IdempotencyKey.objects.filter(
+            user=user, key=key, created_at__gte=now() - KEY_TTL
+        )
+        .exclude(response_url="")
+        .first()
+    )
+    return record.response_url if record else None
+
+
+def claim(user, key, scope):
+    """
+    Reserve ``key`` for this request. Call inside the checkout transaction;
+    returns None when the request carried no key.
+    """
+    if not key:
+        return None
+    try:
+        return IdempotencyKey.objects.create(user=user, key=key, scope=scope)
+    except IntegrityError:
+        raise DuplicateRequest(key)
+
+
+def complete(record, response_url):
+    if record is not None:
+        record.response_url = response_url
+        record.save(update_fields=["response_url"])
+
+
+def purge_expired():
+    """Delete keys older than KEY_TTL; returns how many were removed."""
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=now() - KEY_TTL).delete()
+    return deleted
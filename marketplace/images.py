@@ -0,0 +1,200 @@
+"""
+Resized WebP and JPEG copies of product images, recorded in
+Product.image_variants.
+"""
+
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from . import jobs
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+
+VARIANT_WIDTHS = (160, 320, 640, 1024)
+
+# format key -> (Pillow format, file extension, save options)
+FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def variant_path(source_name, width, fmt):
+    stem, _ = os.path.splitext(source_name)
+    return f"{stem}-{width}w.{FORMATS[fmt][1]}"
+
+
+def widths_for(original_width):
+    widths = [width for width in VARIANT_WIDTHS if width < original_width]
+    return widths or [original_width]
+
+
+def _encode(image, fmt):
+    pil_format, _, options = FORMATS[fmt]
+    if pil_format == "JPEG" and image.mode != "RGB":
+        # JPEG has no alpha channel; flatten onto white
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A") if "A" in image.mode else None)
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def average_color(image):
+    red, green, blue = image.convert("RGB").resize((1, 1), Image.BOX).getpixel((0, 0))
+    return f"#{red:02x}{green:02x}{blue:02x}"
+
+
+def _save(storage, name, data):
+    # Overwrite rather than let the storage pick a "-abc123" alternative,
+    # so names stay predictable from the source name.
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(data))
+
+
+def generate_variants(image_field):
+    """
+    Write the resized copies of ``image_field`` and return the metadata
+    to store in ``Product.image_variants``.
+    """
+    storage = image_field.storage
+    with image_field.open("rb") as source:
+        original = Image.open(source)
+        original.load()
+    original = ImageOps.exif_transpose(original)
+    if original.mode not in ("RGB", "RGBA"):
+        original = original.convert("RGBA" if "transparency" in original.info else "RGB")
+
+    variants = {fmt: {} for fmt in FORMATS}
+    try:
+        for width in widths_for(original.width):
+            height = max(1, round(original.height * width / original.width))
+            resized = original if width == original.width else original.resize(
+                (width, height), Image.LANCZOS
+            )
+            for fmt in FORMATS:
+                name = _save(storage, variant_path(image_field.name, width, fmt), _encode(resized, fmt))
+                variants[fmt][str(width)] = name
+    except Exception:
+        # Don't leave copies behind that no product records
+        delete_variants({"variants": variants}, storage)
+        raise
+
+    return {
+        "source": image_field.name,
+        "width": original.width,
+        "height": original.height,
+        "color": average_color(original),
+        "variants": variants,
+    }
+
+
+def delete_variants(metadata, storage):
+    for names in (metadata or {}).get("variants", {}).values():
+        for name in names.values():
+            storage.delete(name)
+
+
+def variant_name(metadata, width, fmt="jpeg"):
+    """
+    Name of the narrowest stored ``fmt`` copy at least ``width`` pixels
+    wide (or the widest one available), or None if there are none.
+    """
+    sizes = (metadata or {}).get("variants", {}).get(fmt)
+    if not sizes:
+        return None
+    widths = sorted(int(size) for size in sizes)
+    chosen = next((size for size in widths if size >= width), widths[-1])
+    return sizes[str(chosen)]
+
+
+def is_current(product) -> bool:
+    """True when the stored metadata describes the product's current image."""
+    metadata = product.image_variants or {}
+    return (
+        bool(product.image)
+        and metadata.get("source") == product.image.name
+        and not metadata.get("failed")
+    )
+
+
+def has_failed(product) -> bool:
+    """True when processing the product's current image gave up; serve the original."""
+    metadata = product.image_variants or {}
+    return bool(product.image) and metadata.get("source") == product.image.name and bool(
+        metadata.get("failed")
+    )
+
+
+def record_failure(product_id):
+    """Mark the product's current image as unprocessable so it isn't queued again."""
+    product = Product.objects.filter(pk=product_id).only("id", "image").first()
+    if product is None or not product.image:
+        return
+    Product.objects.filter(pk=product.pk, image=product.image.name).update(
+        image_variants={"source": product.image.name, "failed": True}
+    )
+
+
+def refresh_product(product):
+    """
+    Bring ``product.image_variants`` in line with its current image,
+    generating or deleting copies as needed. Returns True if anything changed.
+    """
+    current = product.image_variants or {}
+    source = product.image.name if product.image else None
+    if current.get("source") == source:
+        return False
+
+    storage = product._meta.get_field("image").storage
+    delete_variants(current, storage)
+    metadata = generate_variants(product.image) if source else {}
+    # update() rather than save(): keeps updated_at and the save signals out of it
+    Product.objects.filter(pk=product.pk).update(image_variants=metadata)
+    product.image_variants = metadata
+    return True
+
+
+def verify(image_field) -> bool:
+    """Fully decode-check an upload; False if Pillow can't make sense of it."""
+    with image_field.open("rb") as source:
+        data = source.read()
+    try:
+        Image.open(io.BytesIO(data)).verify()
+    except Exception:
+        return False
+    return True
+
+
+@jobs.register("images.process_upload", on_failure=record_failure)
+def process_upload(product_id):
+    """
+    Check a newly uploaded product image and write its resized copies.
+    An upload Pillow can't read is removed so pages show the placeholder.
+    """
+    product = Product.objects.filter(pk=product_id).only("id", "image", "image_variants").first()
+    if product is None or not product.image or is_current(product) or has_failed(product):
+        return
+
+    if not product.image.storage.exists(product.image.name):
+        # Retrying won't bring the file back
+        logger.warning("Image %s of product %s is missing", product.image.name, product.pk)
+        record_failure(product.pk)
+        return
+
+    if not verify(product.image):
+        logger.warning("Removing unreadable image %s from product %s", product.image.name, product.pk)
+        product.image.storage.delete(product.image.name)
+        Product.objects.filter(pk=product.pk, image=product.image.name).update(
+            image="", image_variants={}
+        )
+        return
+    refresh_product(product)
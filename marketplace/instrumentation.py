@@ -0,0 +1,216 @@
+"""
+Per-request SQL, template and wall-clock timing, with slow-request logging.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_KEPT = 3
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.template_depth = 0
+        self.slowest = []  # (ms, sql), longest first
+        self.statements = Counter()
+
+    @property
+    def wall_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def record_query(self, sql, elapsed_ms):
+        metrics.QUERY_SECONDS.observe(elapsed_ms / 1000)
+        self.queries += 1
+        self.sql_ms += elapsed_ms
+        self.statements[sql] += 1
+        if len(self.slowest) < SLOWEST_KEPT or elapsed_ms > self.slowest[-1][0]:
+            self.slowest.append((elapsed_ms, sql))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[SLOWEST_KEPT:]
+
+    def most_repeated(self):
+        """``(sql, count)`` for the statement run most often, or None."""
+        common = self.statements.most_common(1)
+        return common[0] if common else None
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record_query(sql, (time.perf_counter() - started) * 1000)
+
+
+def _install_template_timer():
+    """Time top-level template renders (includes are part of their parent)."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, "timed", False):
+        return
+    original = Template.render
+
+    @wraps(original)
+    def render(self, context=None, request=None):
+        current = _current.get()
+        if current is None:
+            return original(self, context, request)
+        current.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            current.template_depth -= 1
+            if not current.template_depth:
+                current.template_ms += (time.perf_counter() - started) * 1000
+
+    render.timed = True
+    Template.render = render
+
+
+class EndpointStats:
+    """Rolling samples of wall time and query count per view, shared by all threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(self._new_window)
+
+    @staticmethod
+    def _new_window():
+        return deque(maxlen=getattr(settings, "REQUEST_STATS_WINDOW", 500))
+
+    def add(self, view_name, wall_ms, queries, sql_ms):
+        with self._lock:
+            self._samples[view_name].append((wall_ms, queries, sql_ms))
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def snapshot(self):
+        with self._lock:
+            samples = {name: list(window) for name, window in self._samples.items()}
+        return {name: summarize(window) for name, window in sorted(samples.items())}
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(window):
+    wall = sorted(sample[0] for sample in window)
+    queries = sorted(sample[1] for sample in window)
+    return {
+        "requests": len(window),
+        "wall_ms": {
+            "p50": round(percentile(wall, 0.50), 1),
+            "p95": round(percentile(wall, 0.95), 1),
+            "p99": round(percentile(wall, 0.99), 1),
+            "max": round(wall[-1], 1),
+        },
+        "queries": {
+            "p50": percentile(queries, 0.50),
+            "p95": percentile(queries, 0.95),
+            "max": queries[-1],
+        },
+        "sql_ms_mean": round(sum(sample[2] for sample in window) / len(window), 1),
+    }
+
+
+endpoint_stats = EndpointStats()
+
+
+def snapshot():
+    """Per-view percentiles for this process."""
+    return endpoint_stats.snapshot()
+
+
+def server_timing(request_metrics, wall_ms):
+    return ", ".join([
+        f'db;dur={request_metrics.sql_ms:.1f};desc="{request_metrics.queries} queries"',
+        f"tpl;dur={request_metrics.template_ms:.1f}",
+        f"total;dur={wall_ms:.1f}",
+    ])
+
+
+def _shorten(sql, limit=500):
+    return sql if len(sql) <= limit else sql[:limit] + "..."
+
+
+def log_if_slow(request, view_name, request_metrics, wall_ms):
+    repeated = request_metrics.most_repeated()
+    repeat_limit = getattr(settings, "REPEATED_QUERY_LIMIT", 10)
+    if not (
+        wall_ms > getattr(settings, "SLOW_REQUEST_MS", 500)
+        or request_metrics.queries > getattr(settings, "SLOW_REQUEST_QUERIES", 50)
+        or (repeated and repeated[1] > repeat_limit)
+    ):
+        return
+    lines = [
+        f"Slow request {request.method} {request.path} ({view_name}): "
+        f"{wall_ms:.0f}ms total, {request_metrics.queries} queries in {request_metrics.sql_ms:.0f}ms, "
+        f"templates {request_metrics.template_ms:.0f}ms"
+    ]
+    for elapsed_ms, sql in request_metrics.slowest:
+        lines.append(f"  {elapsed_ms:.1f}ms: {_shorten(sql)}")
+    if repeated and repeated[1] > 1:
+        lines.append(f"  repeated {repeated[1]}x: {_shorten(repeated[0])}")
+    logger.warning("\n".join(lines))
+
+
+class RequestMetricsMiddleware:
+    """Goes first in MIDDLEWARE so the wall time covers the whole stack."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _install_template_timer()
+
+    def __call__(self, request):
+        request_metrics = RequestMetrics()
+        token = _current.set(request_metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(request_metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            # Static files, 404s from the resolver and the like
+            return response
+        wall_ms = request_metrics.wall_ms
+        view_name = match.view_name or match._func_path
+        endpoint_stats.add(view_name, wall_ms, request_metrics.queries, request_metrics.sql_ms)
+        metrics.REQUEST_SECONDS.observe(wall_ms / 1000, view=view_name)
+        metrics.REQUEST_QUERIES.observe(request_metrics.queries, view=view_name)
+        metrics.RESPONSES.inc(view=view_name, method=request.method, status=response.status_code)
+        metrics.flush()
+        if getattr(settings, "SERVER_TIMING_HEADER", True):
+            response["Server-Timing"] = server_timing(request_metrics, wall_ms)
+        log_if_slow(request, view_name, request_metrics, wall_ms)
+        return response
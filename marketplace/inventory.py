@@ -0,0 +1,119 @@
+"""
+Stock tracking for products: checkout reservations with conditional
+updates, release on delivery or cancellation, and delta stock edits.
+"""
+
+from collections import Counter
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from .models import OrderItem, Product
+
+
+CLOSED_STATUSES = {"delivered", "cancelled"}
+
+
+class StockError(Exception):
+    pass
+
+
+class OutOfStock(StockError):
+    def __init__(self, product_name):
+        super().__init__(f"Sorry, there is not enough stock left for {product_name}.")
+        self.product_name = product_name
+
+
+class StockContention(StockError):
+    def __init__(self):
+        super().__init__(
+            "Another buyer is checking out the same product right now. Please try again."
+        )
+
+
+def reserve(lines, using="default"):
+    """
+    Take ``(product, quantity)`` lines out of stock. Must run inside
+    ``transaction.atomic`` so a failure part-way releases earlier lines.
+    """
+    quantities = Counter()
+    names = {}
+    for product, quantity in lines:
+        quantities[product.pk] += quantity
+        names[product.pk] = product.name
+    product_ids = sorted(quantities)
+
+    connection = connections[using]
+    if connection.features.has_select_for_update_nowait:
+        try:
+            # Lock in primary-key order so concurrent carts can't deadlock.
+            list(
+                Product.objects.using(using)
+                .select_for_update(nowait=True)
+                .filter(pk__in=product_ids, stock__isnull=False)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+        except DatabaseError:
+            raise StockContention()
+
+    for product_id in product_ids:
+        quantity = quantities[product_id]
+        # NULL stock (untracked) stays NULL: NULL - n is NULL.
+        updated = (
+            Product.objects.using(using)
+            .filter(Q(stock__isnull=True) | Q(stock__gte=quantity), pk=product_id)
+            .update(
+                stock=F("stock") - quantity,
+                reserved_quantity=F("reserved_quantity") + quantity,
+            )
+        )
+        if not updated:
+            raise OutOfStock(names[product_id])
+
+
+def settle_orders(orders, using="default"):
+    """
+    Release the reservations held by closed (delivered or cancelled) orders.
+    Cancelled units go back into stock. Each item is settled at most once,
+    so calling this again for the same orders is harmless.
+    """
+    for order in orders:
+        status = (order.status or "").lower()
+        if status not in CLOSED_STATUSES:
+            continue
+        restock = status == "cancelled"
+        items = OrderItem.objects.using(using).filter(order=order, stock_reserved=True)
+        for item in items:
+            with transaction.atomic(using=using):
+                claimed = (
+                    OrderItem.objects.using(using)
+                    .filter(pk=item.pk, stock_reserved=True)
+                    .update(stock_reserved=False)
+                )
+                if not claimed:
+                    continue
+                changes = {"reserved_quantity": F("reserved_quantity") - item.quantity}
+                if restock:
+                    changes["stock"] = F("stock") + item.quantity
+                Product.objects.using(using).filter(pk=item.product_id).update(**changes)
+
+
+def apply_stock_edit(product, seen, wanted, using="default"):
+    """
+    Change ``product``'s stock from ``seen`` (what the seller's form showed)
+    to ``wanted`` as a delta on the stored value. Switching tracking on or
+    off (either side NULL) replaces the value outright. Refreshes
+    ``product.stock`` with the result.
+    """
+    if seen != wanted:
+        products = Product.objects.using(using).filter(pk=product.pk)
+        if seen is None or wanted is None:
+            products.update(stock=wanted)
+        else:
+            # Never below zero, in case buyers took more than the seller removed
+            products.filter(stock__isnull=False).update(
+                stock=Greatest(F("stock") + (wanted - seen), 0)
+            )
+    product.refresh_from_db(using=using, fields=["stock"])
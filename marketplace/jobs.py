@@ -0,0 +1,130 @@
+"""A small database-backed job queue, drained by the run_worker command."""
+
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+HANDLERS = {}
+FAILURE_HANDLERS = {}
+
+BACKOFF_BASE = 10  # seconds; doubled on every failed attempt
+BACKOFF_MAX = 60 * 60
+STALE_AFTER = timedelta(minutes=15)
+
+
+def register(kind, on_failure=None):
+    """
+    Decorator registering ``func(**payload)`` as the handler for ``kind``.
+    ``on_failure(**payload)`` is called once a job has used up its attempts.
+    """
+    def decorator(func):
+        HANDLERS[kind] = func
+        if on_failure is not None:
+            FAILURE_HANDLERS[kind] = on_failure
+        return func
+    return decorator
+
+
+def enqueue(kind, payload=None, delay=None, max_attempts=5, unique=False):
+    """
+    Queue a job. With ``unique=True``, nothing is added if an identical job
+    is waiting or running. Returns the job, or None when deduplicated.
+    """
+    payload = payload or {}
+    if unique and Job.objects.filter(
+        kind=kind, payload=payload, status__in=("queued", "running")
+    ).exists():
+        return None
+    return Job.objects.create(
+        kind=kind,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_at=now() + (delay or timedelta()),
+    )
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number ``attempts``, with some jitter."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay + random.uniform(0, delay / 10)
+
+
+def requeue_stale():
+    """Put back jobs whose worker stopped without finishing them."""
+    return Job.objects.filter(
+        status="running", locked_at__lt=now() - STALE_AFTER
+    ).update(status="queued", locked_by="", locked_at=None)
+
+
+def claim(worker_id, limit=1):
+    """Lock up to ``limit`` due jobs for ``worker_id`` and return them."""
+    due = Job.objects.filter(status="queued", run_at__lte=now()).order_by("run_at", "id")
+    claimed_at = now()
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list("id", flat=True)[:limit])
+            Job.objects.filter(id__in=ids).update(
+                status="running", locked_by=worker_id, locked_at=claimed_at
+            )
+    else:
+        ids = []
+        for job_id in due.values_list("id", flat=True)[: limit * 2]:
+            won = Job.objects.filter(id=job_id, status="queued").update(
+                status="running", locked_by=worker_id, locked_at=claimed_at
+            )
+            if won:
+                ids.append(job_id)
+            if len(ids) == limit:
+                break
+    return list(Job.objects.filter(id__in=ids).order_by("run_at", "id"))
+
+
+def run(job):
+    """Run a claimed job and record the outcome. Returns True on success."""
+    handler = HANDLERS.get(job.kind)
+    attempts = job.attempts + 1
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind {job.kind!r}")
+        handler(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if handler is None or attempts >= job.max_attempts:
+            logger.error("Job %s failed permanently:\n%s", job, error)
+            changes = {"status": "failed", "finished_at": now()}
+        else:
+            logger.warning("Job %s failed (attempt %s), retrying:\n%s", job, attempts, error)
+            changes = {"status": "queued", "run_at": now() + timedelta(seconds=backoff(attempts))}
+        Job.objects.filter(pk=job.pk).update(
+            attempts=attempts, last_error=error, locked_by="", locked_at=None, **changes
+        )
+        if changes["status"] == "failed" and job.kind in FAILURE_HANDLERS:
+            try:
+                FAILURE_HANDLERS[job.kind](**job.payload)
+            except Exception:
+                logger.exception("Failure handler for job %s raised", job)
+        return False
+
+    Job.objects.filter(pk=job.pk).update(
+        status="done", attempts=attempts, last_error="", finished_at=now(),
+        locked_by="", locked_at=None,
+    )
+    return True
+
+
+def purge_finished(older_than):
+    """Delete done jobs finished before ``now() - older_than``."""
+    deleted, _ = Job.objects.filter(
+        status="done", finished_at__lt=now() - older_than
+    ).delete()
+    return deleted
@@ -1,8 +1,10 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Sum, Avg
+from django.utils.timezone import localdate
+from marketplace import backends, idempotency, jobs
 from marketplace.models import Product, Order, RatingReview, CartItem
-from decimal import Decimal
+from marketplace.stats import DashboardStats, order_series, signup_series
+from kaumahan.routers import reporting
 import datetime
 
 User = get_user_model()
@@ -37,7 +39,8 @@ class Command(BaseCommand):
         action = options.get('action')
         
         if action == 'stats':
-            self.show_statistics()
+            with reporting():
+                self.show_statistics()
         elif action == 'cleanup':
             self.cleanup_data(options.get('days'))
         elif action == 'approve-sellers':
@@ -45,11 +48,13 @@ class Command(BaseCommand):
         elif action == 'deactivate-inactive-products':
             self.deactivate_inactive_products(options.get('days'))
         elif action == 'export-data':
-            self.export_data()
+            with reporting():
+                self.export_data()
         elif action == 'backup-data':
             self.backup_data()
         elif action == 'check-integrity':
-            self.check_data_integrity()
+            with reporting():
+                self.check_data_integrity()
         else:
             self.show_help()
 
@@ -57,77 +62,66 @@ class Command(BaseCommand):
         """Show comprehensive statistics"""
         self.stdout.write(self.style.SUCCESS('=== KAUMAHAN HARVEST MARKET STATISTICS ==='))
         
-        # User Statistics
-        total_users = User.objects.count()
-        sellers = User.objects.filter(user_type='seller').count()
-        buyers = User.objects.filter(user_type='buyer').count()
-        approved_sellers = User.objects.filter(user_type='seller', is_approved=True).count()
-        pending_sellers = User.objects.filter(user_type='seller', is_approved=False).count()
+        stats = DashboardStats()
         
+        # User Statistics
+        users = stats.users
         self.stdout.write(f'\n👥 USERS:')
-        self.stdout.write(f'  Total Users: {total_users}')
-        self.stdout.write(f'  Sellers: {sellers} (Approved: {approved_sellers}, Pending: {pending_sellers})')
-        self.stdout.write(f'  Buyers: {buyers}')
+        self.stdout.write(f'  Total Users: {users["total"]}')
+        self.stdout.write(
+            f'  Sellers: {users["sellers"]} '
+            f'(Approved: {users["approved_sellers"]}, Pending: {users["pending_sellers"]})'
+        )
+        self.stdout.write(f'  Buyers: {users["buyers"]}')
         
         # Product Statistics
-        total_products = Product.objects.count()
-        active_products = Product.objects.filter(is_active=True).count()
-        inactive_products = Product.objects.filter(is_active=False).count()
-        
+        products = stats.products
         self.stdout.write(f'\n📦 PRODUCTS:')
-        self.stdout.write(f'  Total Products: {total_products}')
-        self.stdout.write(f'  Active Products: {active_products}')
-        self.stdout.write(f'  Inactive Products: {inactive_products}')
+        self.stdout.write(f'  Total Products: {products["total"]}')
+        self.stdout.write(f'  Active Products: {products["active"]}')
+        self.stdout.write(f'  Inactive Products: {products["inactive"]}')
         
         # Order Statistics
-        total_orders = Order.objects.count()
-        pending_orders = Order.objects.filter(status='PENDING').count()
-        confirmed_orders = Order.objects.filter(status='CONFIRMED').count()
-        shipped_orders = Order.objects.filter(status='SHIPPED').count()
-        delivered_orders = Order.objects.filter(status='DELIVERED').count()
-        cancelled_orders = Order.objects.filter(status='CANCELLED').count()
-        
-        total_revenue = Order.objects.filter(status='DELIVERED').aggregate(
-            total=Sum('total_amount')
-        )['total'] or Decimal('0')
-        
+        orders = stats.orders
         self.stdout.write(f'\n🛒 ORDERS:')
-        self.stdout.write(f'  Total Orders: {total_orders}')
-        self.stdout.write(f'  Pending: {pending_orders}')
-        self.stdout.write(f'  Confirmed: {confirmed_orders}')
-        self.stdout.write(f'  Shipped: {shipped_orders}')
-        self.stdout.write(f'  Delivered: {delivered_orders}')
-        self.stdout.write(f'  Cancelled: {cancelled_orders}')
-        self.stdout.write(f'  Total Revenue: ₱{total_revenue:,.2f}')
+        self.stdout.write(f'  Total Orders: {orders["total"]}')
+        self.stdout.write(f'  Pending: {orders["pending"]}')
+        self.stdout.write(f'  Confirmed: {orders["confirmed"]}')
+        self.stdout.write(f'  Shipped: {orders["shipped"]}')
+        self.stdout.write(f'  Delivered: {orders["delivered"]}')
+        self.stdout.write(f'  Cancelled: {orders["cancelled"]}')
+        self.stdout.write(f'  Total Revenue: ₱{orders["revenue"]:,.2f}')
         
         # Review Statistics
-        total_reviews = RatingReview.objects.count()
-        approved_reviews = RatingReview.objects.filter(is_approved=True).count()
-        pending_reviews = RatingReview.objects.filter(is_approved=False).count()
-        avg_rating = RatingReview.objects.filter(is_approved=True).aggregate(
-            avg=Avg('rating')
-        )['avg'] or 0
-        
+        reviews = stats.reviews
         self.stdout.write(f'\n⭐ REVIEWS:')
-        self.stdout.write(f'  Total Reviews: {total_reviews}')
-        self.stdout.write(f'  Approved: {approved_reviews}')
-        self.stdout.write(f'  Pending: {pending_reviews}')
-        self.stdout.write(f'  Average Rating: {avg_rating:.1f}/5')
+        self.stdout.write(f'  Total Reviews: {reviews["total"]}')
+        self.stdout.write(f'  Approved: {reviews["approved"]}')
+        self.stdout.write(f'  Pending: {reviews["pending"]}')
+        self.stdout.write(f'  Average Rating: {reviews["average_rating"]:.1f}/5')
         
         # Cart Statistics
-        active_carts = CartItem.objects.values('user').distinct().count()
-        total_cart_items = CartItem.objects.count()
-        
+        carts = stats.carts
         self.stdout.write(f'\n🛒 CART:')
-        self.stdout.write(f'  Active Carts: {active_carts}')
-        self.stdout.write(f'  Total Cart Items: {total_cart_items}')
+        self.stdout.write(f'  Active Carts: {carts["active"]}')
+        self.stdout.write(f'  Total Cart Items: {carts["items"]}')
+        
+        # Recent activity, read from the daily rollup where available
+        today = localdate()
+        start = today - datetime.timedelta(days=29)
+        recent_orders = sum(row['count'] for row in order_series(start, today))
+        recent_signups = sum(row['count'] for row in signup_series(start, today, 'day'))
+        
+        self.stdout.write(f'\n📈 LAST 30 DAYS:')
+        self.stdout.write(f'  Orders Placed: {recent_orders}')
+        self.stdout.write(f'  New Users: {recent_signups}')
 
     def cleanup_data(self, days):
         """Clean up old data"""
         cutoff_date = datetime.datetime.now() - datetime.timedelta(days=days)
         
         # Clean up old cart items
-        old_cart_items = CartItem.objects.filter(added_at__lt=cutoff_date)
+        old_cart_items = CartItem.objects.filter(created_at__lt=cutoff_date)
         cart_count = old_cart_items.count()
         old_cart_items.delete()
         
@@ -142,6 +136,16 @@ class Command(BaseCommand):
         old_cancelled_orders.delete()
         
         self.stdout.write(self.style.SUCCESS(f'Cleaned up {order_count} old cancelled orders'))
+        
+        # Idempotency keys only matter while a checkout might be retried
+        key_count = idempotency.purge_expired()
+        
+        self.stdout.write(self.style.SUCCESS(f'Cleaned up {key_count} expired checkout keys'))
+        
+        # Finished background jobs; failed ones are kept for inspection
+        job_count = jobs.purge_finished(datetime.timedelta(days=days))
+        
+        self.stdout.write(self.style.SUCCESS(f'Cleaned up {job_count} finished background jobs'))
 
     def approve_pending_sellers(self):
         """Approve all pending sellers"""
@@ -152,7 +156,9 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('No pending sellers to approve'))
             return
         
+        seller_ids = list(pending_sellers.values_list('pk', flat=True))
         pending_sellers.update(is_approved=True)
+        backends.forget_users(seller_ids)
         self.stdout.write(self.style.SUCCESS(f'Approved {count} sellers'))
 
     def deactivate_inactive_products(self, days):
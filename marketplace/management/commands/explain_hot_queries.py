@@ -0,0 +1,105 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from marketplace import queries
+from marketplace.pagination import KeysetPaginator
+
+# Plan lines that mean a table is read in full
+FULL_SCAN = {
+    'postgresql': re.compile(r'\bSeq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)\s*$', re.MULTILINE),
+}
+
+
+def hot_queries(user_id, product_id, database='default'):
+    """
+    The dashboard and catalog queries the Meta.indexes are meant to serve,
+    built by the same marketplace.queries helpers the views use.
+    """
+    catalog = KeysetPaginator(
+        queries.catalog_products(),
+        ordering=queries.CATALOG_ORDERING,
+        per_page=queries.CATALOG_PAGE_SIZE,
+    )
+    hot = [
+        ('catalog page', catalog.page_queryset()),
+        ('featured products', queries.featured_products()),
+        ('map sellers', queries.map_sellers()),
+        ('seller products', queries.seller_products(user_id)),
+        ('seller recent orders', queries.seller_orders(user_id)[:10]),
+        ('seller orders', queries.seller_orders(user_id)),
+        ('seller reviews', queries.seller_reviews(user_id)[:10]),
+        ('buyer orders', queries.buyer_orders(user_id)),
+        ('product reviews', queries.approved_reviews(product_id)),
+        ('pending sellers', queries.pending_sellers()[:5]),
+        ('pending reviews', queries.pending_reviews()[:5]),
+    ]
+    newest = queries.catalog_products().using(database).order_by(*queries.CATALOG_ORDERING).first()
+    if newest is not None:
+        hot.insert(1, ('catalog next page', catalog.page_queryset(catalog.encode(newest))))
+    return hot
+
+
+class Command(BaseCommand):
+    help = "Show the query plan of each hot marketplace query and flag full table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Database to explain against (default: default)'
+        )
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            default=1,
+            help='Buyer/seller id to plug into the per-user queries'
+        )
+        parser.add_argument(
+            '--product-id',
+            type=int,
+            default=1,
+            help='Product id to plug into the per-product queries'
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the full plan for every query, not just the scans'
+        )
+        parser.add_argument(
+            '--fail-on-scan',
+            action='store_true',
+            help='Exit with an error if any query scans a whole table'
+        )
+
+    def handle(self, *args, **options):
+        database = options['database']
+        vendor = connections[database].vendor
+        full_scan = FULL_SCAN.get(vendor)
+        if full_scan is None:
+            self.stdout.write(self.style.WARNING(
+                f"Can't classify {vendor} plans; printing them as they are"
+            ))
+
+        scans = []
+        for label, queryset in hot_queries(options['user_id'], options['product_id'], database):
+            plan = queryset.using(database).explain()
+            tables = sorted(set(full_scan.findall(plan))) if full_scan else []
+            if tables:
+                scans.append(label)
+                self.stdout.write(self.style.WARNING(f"{label}: full scan of {', '.join(tables)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{label}: uses an index"))
+            if options['verbose_plans'] or tables or full_scan is None:
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+
+        if vendor == 'postgresql':
+            self.stdout.write(
+                'PostgreSQL prefers sequential scans on small tables; '
+                'run ANALYZE and check against production-sized data.'
+            )
+        if scans and options['fail_on_scan']:
+            raise CommandError(f"Full table scans in: {', '.join(scans)}")
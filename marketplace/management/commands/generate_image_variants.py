@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from marketplace import fragments, images
+from marketplace.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Generate the resized WebP/JPEG copies of product images that are missing or stale'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--product-id',
+            type=int,
+            action='append',
+            dest='product_ids',
+            help='Only process this product (may be given more than once)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate copies even when they look up to date'
+        )
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True)
+        if options.get('product_ids'):
+            products = products.filter(pk__in=options['product_ids'])
+
+        generated = failed = 0
+        for product in products.only('id', 'image', 'image_variants').iterator():
+            if options['force']:
+                product.image_variants = {**product.image_variants, 'source': None}
+            try:
+                if images.refresh_product(product):
+                    generated += 1
+            except (OSError, ValueError) as e:
+                failed += 1
+                self.stderr.write(f'Product {product.pk}: {e}')
+
+        if generated and options['force']:
+            # Regenerated copies keep their source name, which the card cache keys on
+            fragments.invalidate_cards()
+
+        self.stdout.write(self.style.SUCCESS(f'Generated image variants for {generated} products'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} products could not be processed'))
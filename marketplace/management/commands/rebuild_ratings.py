@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from marketplace import ratings
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the stored rating aggregates on every product from approved reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--product-id',
+            type=int,
+            action='append',
+            dest='product_ids',
+            help='Only rebuild this product (may be given more than once)'
+        )
+
+    def handle(self, *args, **options):
+        count = ratings.recalculate(options.get('product_ids'))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {count} products'))
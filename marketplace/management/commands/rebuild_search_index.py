@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from marketplace import search
+from marketplace.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text product search index from the Product table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Database alias to rebuild the index on'
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not search.is_available(using):
+            raise CommandError(
+                'No full-text index on this database. Run "migrate" first; '
+                'backends other than SQLite (with FTS5) and PostgreSQL use icontains search.'
+            )
+
+        count = search.rebuild_index(Product, using=using)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} products'))
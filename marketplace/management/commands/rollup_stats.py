@@ -0,0 +1,45 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import localdate
+
+from marketplace.stats import first_activity_date, rollup_days, rollup_watermark
+
+
+class Command(BaseCommand):
+    help = 'Roll up daily marketplace statistics since the last run (safe to re-run)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=datetime.date.fromisoformat,
+            help='First day to (re)compute, YYYY-MM-DD (default: last rolled-up day)'
+        )
+        parser.add_argument(
+            '--until',
+            type=datetime.date.fromisoformat,
+            help='Last day to compute, YYYY-MM-DD (default: today)'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every day since the first recorded activity'
+        )
+
+    def handle(self, *args, **options):
+        until = options.get('until') or localdate()
+
+        if options.get('full'):
+            since = first_activity_date()
+        else:
+            # The watermark day may have been rolled up mid-day, so redo it.
+            since = options.get('since') or rollup_watermark() or first_activity_date()
+
+        if since is None:
+            self.stdout.write(self.style.WARNING('No marketplace activity to roll up'))
+            return
+        if since > until:
+            raise CommandError(f'--since ({since}) is after --until ({until})')
+
+        count = rollup_days(since, until)
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {count} days ({since} to {until})'))
@@ -0,0 +1,74 @@
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from marketplace import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (image processing and the like) from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=int(os.environ.get('JOB_WORKER_CONCURRENCY', 2)),
+            help='Number of jobs to run at once (default: $JOB_WORKER_CONCURRENCY or 2)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the queue is empty'
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once no jobs are due instead of waiting for more'
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        stopping = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write('Finishing running jobs before exiting...')
+            stopping.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f'Worker {worker_id} started with {concurrency} threads')
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while not stopping.is_set():
+                close_old_connections()
+                jobs.requeue_stale()
+                claimed = jobs.claim(worker_id, limit=concurrency)
+                if not claimed:
+                    if options['burst']:
+                        break
+                    stopping.wait(options['poll_interval'])
+                    continue
+
+                for ok in pool.map(self.run_job, claimed):
+                    if ok:
+                        done += 1
+                    else:
+                        failed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Worker stopped: {done} jobs done, {failed} failed'))
+
+    @staticmethod
+    def run_job(job):
+        # Each pool thread opens its own connection; don't hold it between jobs
+        try:
+            return jobs.run(job)
+        finally:
+            connections.close_all()
@@ -0,0 +1,144 @@
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from PIL import Image
+
+from marketplace.models import MediaBlob, Product
+
+
+class Command(BaseCommand):
+    help = 'Check product media for missing, corrupt, wrongly sized and orphaned files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=16,
+            help='Files to check at once (default: 16)'
+        )
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='Where to write the JSON report (default: stdout)'
+        )
+        parser.add_argument(
+            '--prefix',
+            default='products',
+            help='Media directory to look for orphaned files in (default: products)'
+        )
+        parser.add_argument(
+            '--skip-decode',
+            action='store_true',
+            help="Only stat files; don't open images to check they decode"
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        self.storage = default_storage
+        self.decode = not options['skip_decode']
+
+        # Every stored name a product refers to: name -> (product ids, kind)
+        references = {}
+        product_count = 0
+        rows = Product.objects.values_list('id', 'image', 'image_variants').iterator(chunk_size=2000)
+        for product_id, image, variants in rows:
+            product_count += 1
+            if image:
+                references.setdefault(image, ([], 'image'))[0].append(product_id)
+            for names in (variants or {}).get('variants', {}).values():
+                for name in names.values():
+                    references.setdefault(name, ([], 'variant'))[0].append(product_id)
+
+        expected_sizes = dict(
+            MediaBlob.objects.filter(name__in=list(references)).values_list('name', 'size')
+        ) if references else {}
+
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            orphans = pool.submit(self.find_orphans, options['prefix'], set(references))
+            results = list(pool.map(
+                lambda name: self.check_file(name, expected_sizes.get(name)), references
+            ))
+
+        report = {
+            'scanned_at': timezone.now().isoformat(),
+            'storage': type(getattr(self.storage, '_wrapped', self.storage)).__name__,
+            'products': product_count,
+            'files_checked': len(references),
+            'missing': [],
+            'corrupt': [],
+            'size_mismatch': [],
+            'orphans': sorted(orphans.result()),
+        }
+        for name, (problem, detail) in zip(references, results):
+            if problem is None:
+                continue
+            product_ids, kind = references[name]
+            report[problem].append({'name': name, 'kind': kind, 'product_ids': product_ids, **detail})
+        report['duration_seconds'] = round(time.monotonic() - started, 3)
+
+        payload = json.dumps(report, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(payload)
+        else:
+            with open(options['output'], 'w') as f:
+                f.write(payload)
+
+        summary = (
+            f"Scanned {len(references)} files for {product_count} products in "
+            f"{report['duration_seconds']}s: {len(report['missing'])} missing, "
+            f"{len(report['corrupt'])} corrupt, {len(report['size_mismatch'])} size mismatches, "
+            f"{len(report['orphans'])} orphans"
+        )
+        problems = sum(len(report[key]) for key in ('missing', 'corrupt', 'size_mismatch', 'orphans'))
+        style = self.style.WARNING if problems else self.style.SUCCESS
+        self.stderr.write(style(summary))
+
+    def check_file(self, name, expected_size):
+        """Return (problem, detail) for one stored file, or (None, None)."""
+        try:
+            size = self.storage.size(name)
+        except (OSError, ValueError):
+            return 'missing', {}
+        if size == 0 or (expected_size is not None and size != expected_size):
+            return 'size_mismatch', {'expected': expected_size, 'actual': size}
+        if self.decode:
+            try:
+                with self.storage.open(name, 'rb') as f:
+                    Image.open(io.BytesIO(f.read())).verify()
+            except Exception as e:
+                return 'corrupt', {'error': str(e)}
+        return None, None
+
+    def find_orphans(self, prefix, referenced):
+        """Names under ``prefix`` that no product refers to."""
+        if hasattr(self.storage, 'path'):
+            try:
+                root = self.storage.path(prefix)
+            except NotImplementedError:
+                root = None
+            if root is not None:
+                base = self.storage.path('')
+                found = []
+                for directory, _, files in os.walk(root):
+                    for filename in files:
+                        name = os.path.relpath(os.path.join(directory, filename), base).replace(os.sep, '/')
+                        if name not in referenced:
+                            found.append(name)
+                return found
+        return self._listdir_orphans(prefix, referenced)
+
+    def _listdir_orphans(self, prefix, referenced):
+        try:
+            directories, files = self.storage.listdir(prefix)
+        except (OSError, NotImplementedError):
+            return []
+        found = [f'{prefix}/{name}' for name in files if f'{prefix}/{name}' not in referenced]
+        for directory in directories:
+            found.extend(self._listdir_orphans(f'{prefix}/{directory}', referenced))
+        return found
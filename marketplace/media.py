@@ -0,0 +1,164 @@
+"""
+Streams uploaded files from MEDIA_ROOT with ranges, validators and
+Cache-Control, or hands them to the web server via X-Sendfile.
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from . import metrics
+
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{64}(?:\.\w+)?$")
+
+
+def resolve(path, document_root=None):
+    """Absolute path of ``path`` under the media root, or Http404."""
+    try:
+        full_path = safe_join(document_root or settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("File not found")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found")
+    return full_path
+
+
+def etag_for(stat):
+    return quote_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+
+
+def is_content_addressed(path) -> bool:
+    """True for names whose stem is the SHA-256 of the file's content."""
+    return bool(_CONTENT_ADDRESSED.match(os.path.basename(path)))
+
+
+def _add_validators(response, path, stat):
+    response["ETag"] = etag_for(stat)
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    if is_content_addressed(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(
+            response, public=True, max_age=getattr(settings, "MEDIA_CACHE_MAX_AGE", 3600)
+        )
+    return response
+
+
+def parse_range(header, size):
+    """
+    Turn a ``Range`` header into an inclusive ``(start, end)`` pair.
+
+    Returns None when the header is absent, malformed or asks for several
+    ranges (the full file is sent instead), and ``(None, None)`` when the
+    range lies outside the file.
+    """
+    match = _RANGE.match((header or "").strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # "bytes=-500" is the final 500 bytes
+        length = int(last)
+        if not length or not size:
+            return None, None
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return None, None
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _sendfile_response(full_path, document_root, content_type):
+    header = settings.MEDIA_SENDFILE_HEADER
+    response = HttpResponse(content_type=content_type)
+    if header.lower() == "x-accel-redirect":
+        relative = os.path.relpath(full_path, document_root).replace(os.sep, "/")
+        prefix = getattr(settings, "MEDIA_SENDFILE_PREFIX", "/protected-media/").rstrip("/")
+        response[header] = f"{prefix}/{quote(relative)}"
+    else:
+        response[header] = full_path
+    return response
+
+
+def serve(request, path, document_root=None):
+    """
+    Send the media file at ``path``, answering conditional requests with 304
+    and honouring single byte ranges.
+    """
+    document_root = os.fspath(document_root or settings.MEDIA_ROOT)
+    full_path = resolve(path, document_root)
+    stat = os.stat(full_path)
+    etag = etag_for(stat)
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if not_modified is not None:
+        metrics.MEDIA_RESPONSES.inc(status=not_modified.status_code)
+        return _add_validators(not_modified, path, stat)
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+
+    if getattr(settings, "MEDIA_SENDFILE_HEADER", ""):
+        response = _sendfile_response(full_path, document_root, content_type)
+        metrics.MEDIA_RESPONSES.inc(status=response.status_code)
+        metrics.MEDIA_BYTES.inc(stat.st_size, mode="sendfile")
+        return _add_validators(response, path, stat)
+
+    requested = parse_range(request.headers.get("Range"), stat.st_size)
+    if_range = request.headers.get("If-Range")
+    if requested and if_range and if_range != etag and (
+        parse_http_date_safe(if_range) != int(stat.st_mtime)
+    ):
+        # The client's partial copy is stale; send the whole file
+        requested = None
+
+    if requested == (None, None):
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+    elif requested:
+        start, end = requested
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _read_range(full_path, start, length), status=206, content_type=content_type
+        )
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        metrics.MEDIA_BYTES.inc(length, mode="stream")
+    else:
+        response = FileResponse(open(full_path, "rb"), content_type=content_type)
+        response.block_size = CHUNK_SIZE
+        metrics.MEDIA_BYTES.inc(stat.st_size, mode="stream")
+    metrics.MEDIA_RESPONSES.inc(status=response.status_code)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Accept-Ranges"] = "bytes"
+    return _add_validators(response, path, stat)
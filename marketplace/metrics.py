@@ -0,0 +1,289 @@
+"""
+Prometheus metrics at /metrics, summed across the worker processes'
+METRICS_DIR files.
+"""
+
+import atexit
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+ARCHIVE = "archive"
+
+_lock = threading.Lock()
+_counters = {}  # (name, label values) -> value
+_histograms = {}  # (name, label values) -> [bucket counts..., sum, count]
+_registry = {}  # name -> metric
+_last_flush = 0.0
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help_text, self.labels = name, help_text, tuple(labels)
+        _registry[name] = self
+
+    def inc(self, amount=1, **labels):
+        key = (self.name, tuple(str(labels[label]) for label in self.labels))
+        with _lock:
+            _counters[key] = _counters.get(key, 0) + amount
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name, self.help_text, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        _registry[name] = self
+
+    def observe(self, value, **labels):
+        key = (self.name, tuple(str(labels[label]) for label in self.labels))
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            values = _histograms.get(key)
+            if values is None:
+                values = _histograms[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                values[index] += 1  # above the last bucket only counts toward +Inf
+            values[-2] += value
+            values[-1] += 1
+
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to produce a response, by URL name",
+    LATENCY_BUCKETS, labels=("view",),
+)
+RESPONSES = Counter(
+    "http_responses_total", "Responses by URL name, method and status code",
+    labels=("view", "method", "status"),
+)
+REQUEST_QUERIES = Histogram(
+    "db_queries_per_request", "SQL statements run per request, by URL name",
+    (1, 2, 5, 10, 20, 50, 100, 200), labels=("view",),
+)
+QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Time taken by individual SQL statements",
+    (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Page and user cache lookups by result (hit or miss)",
+    labels=("cache", "result"),
+)
+CHECKOUTS = Counter(
+    "checkouts_total", "Checkout attempts by flow (cart or direct) and outcome",
+    labels=("flow", "outcome"),
+)
+MEDIA_BYTES = Counter(
+    "media_bytes_served_total", "Media bytes sent, or handed to the web server to send",
+    labels=("mode",),
+)
+MEDIA_RESPONSES = Counter(
+    "media_responses_total", "Media responses by status code", labels=("status",),
+)
+
+
+# --- Per-process files ---------------------------------------------------
+
+def metrics_dir():
+    # Liveness is checked by process id, so keep this local to the host
+    path = getattr(settings, "METRICS_DIR", "") or os.path.join(
+        tempfile.gettempdir(), "kaumahan-metrics"
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _serialize(counters, histograms):
+    return {
+        "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+        "histograms": [[name, list(labels), list(values)] for (name, labels), values in histograms.items()],
+    }
+
+
+def _dump():
+    with _lock:
+        return _serialize(_counters, _histograms)
+
+
+def _write(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def flush(force=False):
+    """Write this process's values to its file (at most every few seconds)."""
+    global _last_flush
+    if fcntl is None:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < getattr(settings, "METRICS_FLUSH_SECONDS", 5):
+        return
+    _last_flush = now
+    _write(os.path.join(metrics_dir(), f"{os.getpid()}.json"), _dump())
+
+
+# Keep what a worker counted since its last flush when it exits cleanly
+atexit.register(flush, force=True)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"counters": [], "histograms": []}
+
+
+def _merge(totals, data):
+    counters, histograms = totals
+    for name, labels, value in data["counters"]:
+        key = (name, tuple(labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, values in data["histograms"]:
+        key = (name, tuple(labels))
+        if key in histograms and len(histograms[key]) == len(values):
+            histograms[key] = [a + b for a, b in zip(histograms[key], values)]
+        else:
+            histograms[key] = list(values)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def _directory_lock(directory):
+    with open(os.path.join(directory, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def collect():
+    """Sum the values of every process, archiving those that have exited."""
+    if fcntl is None:
+        totals = ({}, {})
+        _merge(totals, _dump())
+        return totals
+    flush(force=True)
+    directory = metrics_dir()
+    totals = ({}, {})
+    with _directory_lock(directory):
+        archive_path = os.path.join(directory, f"{ARCHIVE}.json")
+        archive = ({}, {})
+        _merge(archive, _read(archive_path))
+        archived = False
+        for filename in os.listdir(directory):
+            stem, ext = os.path.splitext(filename)
+            if ext != ".json" or not stem.isdigit():
+                continue
+            path = os.path.join(directory, filename)
+            if _alive(int(stem)):
+                _merge(totals, _read(path))
+            else:
+                _merge(archive, _read(path))
+                os.remove(path)
+                archived = True
+        if archived:
+            _write(archive_path, _serialize(*archive))
+    _merge(totals, _serialize(*archive))
+    return totals
+
+
+# --- Exposition ----------------------------------------------------------
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _queue_depth():
+    from .models import Job
+
+    rows = Job.objects.values("status").annotate(count=Count("id")).order_by("status")
+    return [(row["status"], row["count"]) for row in rows]
+
+
+def render():
+    counters, histograms = collect()
+    lines = []
+    for name, metric in _registry.items():
+        lines.append(f"# HELP {name} {metric.help_text}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        if metric.kind == "counter":
+            for (metric_name, labels), value in sorted(counters.items()):
+                if metric_name == name:
+                    lines.append(f"{name}{_labels(metric.labels, labels)} {_number(value)}")
+            continue
+        for (metric_name, labels), values in sorted(histograms.items()):
+            if metric_name != name:
+                continue
+            # values holds one count per bucket, then the sum and the total count
+            cumulative = 0
+            for bound, count in zip(metric.buckets, values):
+                cumulative += count
+                lines.append(
+                    f"{name}_bucket{_labels(metric.labels, labels, [('le', _number(bound))])} {cumulative}"
+                )
+            lines.append(f"{name}_bucket{_labels(metric.labels, labels, [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{name}_sum{_labels(metric.labels, labels)} {_number(values[-2])}")
+            lines.append(f"{name}_count{_labels(metric.labels, labels)} {values[-1]}")
+
+    lines.append("# HELP job_queue_depth Background jobs by status")
+    lines.append("# TYPE job_queue_depth gauge")
+    for status, count in _queue_depth():
+        lines.append(f"job_queue_depth{_labels(('status',), (status,))} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def _authorized(request):
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    token = getattr(settings, "METRICS_TOKEN", "")
+    header = request.headers.get("Authorization", "")
+    return bool(token) and constant_time_compare(header, f"Bearer {token}")
+
+
+def metrics_view(request):
+    if not _authorized(request):
+        return HttpResponse("Forbidden\n", status=403, content_type="text/plain")
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
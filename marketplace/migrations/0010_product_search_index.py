@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from marketplace import search
+
+    if search.install(schema_editor.connection):
+        Product = apps.get_model("marketplace", "Product")
+        search.rebuild_index(Product, using=schema_editor.connection.alias)
+
+
+def drop_search_index(apps, schema_editor):
+    from marketplace import search
+
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0009_merge_20241128_0635'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.10 on 2026-10-18 10:53
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model('marketplace', 'Product')
+    RatingReview = apps.get_model('marketplace', 'RatingReview')
+    db = schema_editor.connection.alias
+    approved = (
+        RatingReview.objects.using(db)
+        .filter(product=OuterRef('pk'), is_approved=True)
+        .order_by()
+        .values('product')
+    )
+    Product.objects.using(db).update(
+        rating_sum=Coalesce(
+            Subquery(approved.annotate(total=Sum('rating')).values('total')),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+        rating_count=Coalesce(
+            Subquery(approved.annotate(total=Count('id')).values('total')),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+        rating_avg=Subquery(
+            approved.annotate(avg=Avg('rating')).values('avg'),
+            output_field=FloatField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0010_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
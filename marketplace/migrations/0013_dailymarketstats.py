@@ -0,0 +1,31 @@
+# Generated by Django 4.2.10 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0012_product_catalog_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMarketStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Total value of orders placed that day', max_digits=12)),
+                ('new_buyers', models.PositiveIntegerField(default=0)),
+                ('new_sellers', models.PositiveIntegerField(default=0)),
+                ('new_reviews', models.PositiveIntegerField(default=0)),
+                ('category_counts', models.JSONField(blank=True, default=dict, help_text='Units ordered that day per product category')),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'daily market stats',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0013_dailymarketstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='group_id',
+            field=models.UUIDField(blank=True, db_index=True, editable=False, help_text='Shared by the per-seller orders created from one cart checkout', null=True),
+        ),
+    ]
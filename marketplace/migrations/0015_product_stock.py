@@ -0,0 +1,28 @@
+# Generated by Django 4.2.10 on 2026-10-18 10:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0014_order_group_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='stock_reserved',
+            field=models.BooleanField(default=False, editable=False, help_text='Still holding product stock; cleared when the order is delivered or cancelled'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reserved_quantity',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Units in orders that are not yet delivered or cancelled'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='stock',
+            field=models.PositiveIntegerField(blank=True, help_text='Units available to buyers. Leave blank to sell without a limit.', null=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0019_mediablob'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_active_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['user_type', 'is_approved'], name='user_type_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['buyer', '-created_at'], name='order_buyer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['seller', '-created_at'], name='order_seller_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at', '-id'], name='product_catalog_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['seller', 'is_active'], name='product_seller_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ratingreview',
+            index=models.Index(fields=['product', 'is_approved', '-created_at'], name='review_product_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ratingreview',
+            index=models.Index(condition=models.Q(('is_approved', False)), fields=['-created_at'], name='review_pending_idx'),
+        ),
+    ]
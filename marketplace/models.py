@@ -5,6 +5,8 @@ from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
+from django.utils.timezone import localdate
 
 
 class CustomUserManager(BaseUserManager):
@@ -67,6 +69,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
+    class Meta:
+        indexes = [
+            # Seller listings, the map and the admin's pending-seller queue.
+            models.Index(fields=["user_type", "is_approved"], name="user_type_approved_idx"),
+        ]
+
     def __str__(self) -> str:
         return self.full_name or self.email
 
@@ -131,17 +139,61 @@ class Product(models.Model):
     )
     
     image = models.ImageField(upload_to="products/", blank=True, null=True)
+    # Resized copies of the image, maintained by marketplace.images.
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    # Stock levels, maintained by marketplace.inventory.
+    stock = models.PositiveIntegerField(
+        blank=True, null=True,
+        help_text="Units available to buyers. Leave blank to sell without a limit.",
+    )
+    reserved_quantity = models.PositiveIntegerField(
+        default=0, editable=False,
+        help_text="Units in orders that are not yet delivered or cancelled",
+    )
+
+    # Approved-review aggregates, maintained by marketplace.ratings.
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_avg = models.DecimalField(
+        max_digits=3, decimal_places=2, blank=True, null=True, editable=False
+    )
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the buyer catalog orders by (created_at, id)
+            # over active products only; partial, so inactive rows stay out.
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(is_active=True),
+                name="product_catalog_idx",
+            ),
+            # Seller dashboards and product management.
+            models.Index(fields=["seller", "is_active"], name="product_seller_active_idx"),
+        ]
+
     def __str__(self) -> str:
         return self.name
 
     @property
     def average_rating(self) -> Decimal | None:
-        agg = self.reviews.filter(is_approved=True).aggregate(models.Avg("rating"))
-        return agg["rating__avg"]
+        return self.rating_avg
+
+    @property
+    def in_stock(self) -> bool:
+        return self.stock is None or self.stock > 0
+
+    def image_variant_url(self, width, fmt="jpeg"):
+        """URL of the smallest stored copy at least ``width`` wide, else the original."""
+        from .images import is_current, variant_name
+
+        name = variant_name(self.image_variants, width, fmt)
+        if name and is_current(self):
+            return self.image.storage.url(name)
+        return self.image.url if self.image else None
 
 
 class CartItem(models.Model):
@@ -191,9 +243,22 @@ class Order(models.Model):
     payment_method = models.CharField(max_length=20, default="COD")
     shipping_address = models.CharField(max_length=255)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    group_id = models.UUIDField(
+        blank=True, null=True, db_index=True, editable=False,
+        help_text="Shared by the per-seller orders created from one cart checkout",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Order history pages list newest first per buyer or seller.
+            models.Index(fields=["buyer", "-created_at"], name="order_buyer_created_idx"),
+            models.Index(fields=["seller", "-created_at"], name="order_seller_created_idx"),
+            # Status counts and the dashboard charts over a date range.
+            models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"Order #{self.pk}"
 
@@ -205,6 +270,10 @@ class OrderItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    stock_reserved = models.BooleanField(
+        default=False, editable=False,
+        help_text="Still holding product stock; cleared when the order is delivered or cancelled",
+    )
 
     def __str__(self) -> str:
         return f"{self.product.name} ({self.quantity})"
@@ -258,6 +327,117 @@ class RatingReview(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # A product's approved reviews, newest first.
+            models.Index(
+                fields=["product", "is_approved", "-created_at"],
+                name="review_product_approved_idx",
+            ),
+            # The moderation queue is a small slice of the table; a partial
+            # index keeps it small (ignored on backends without them).
+            models.Index(
+                fields=["-created_at"],
+                condition=models.Q(is_approved=False),
+                name="review_pending_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.rating} stars by {self.buyer.email} for {self.product.name}"
+
+
+class DailyMarketStats(models.Model):
+    """Per-day marketplace totals, written by the ``rollup_stats`` command."""
+
+    date = models.DateField(unique=True)
+    orders = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0,
+        help_text="Total value of orders placed that day",
+    )
+    new_buyers = models.PositiveIntegerField(default=0)
+    new_sellers = models.PositiveIntegerField(default=0)
+    new_reviews = models.PositiveIntegerField(default=0)
+    category_counts = models.JSONField(
+        default=dict, blank=True,
+        help_text="Units ordered that day per product category",
+    )
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-date"]
+        verbose_name_plural = "daily market stats"
+
+    def __str__(self) -> str:
+        return f"Market stats for {self.date}"
+
+    @property
+    def is_complete(self) -> bool:
+        """True once the row was computed after its day ended."""
+        return localdate(self.computed_at) > self.date
+
+
+class IdempotencyKey(models.Model):
+    """
+    A checkout request already handled for a buyer, so a replayed POST
+    (double click, mobile retry) gets the original redirect back.
+    """
+
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="idempotency_keys"
+    )
+    key = models.CharField(max_length=64)
+    scope = models.CharField(max_length=50)
+    response_url = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ("user", "key")
+
+    def __str__(self) -> str:
+        return f"{self.scope} {self.key} for {self.user}"
+
+
+class Job(models.Model):
+    """A unit of background work, run by the ``run_worker`` command."""
+
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["run_at", "id"]
+        indexes = [
+            # The worker's poll: queued jobs that are due, oldest first.
+            models.Index(fields=["status", "run_at"], name="job_status_run_at_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class MediaBlob(models.Model):
+    """Reference count for a file kept by kaumahan.storage.ContentAddressedStorage."""
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.refcount} references)"
@@ -0,0 +1,130 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of ``OFFSET``, each page filters on the ordering key of the last row
+it returned, so with a matching index page N costs the same as page 1. The
+cursor handed to the client is an opaque URL-safe token encoding that key.
+"""
+
+import base64
+import datetime
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder drops microseconds, which would skip rows that
+        # share a millisecond.
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` by ``ordering``, a sequence of field or annotation
+    names (prefix ``-`` for descending). The last key must be unique, e.g.
+    ``("-created_at", "-id")``.
+    """
+
+    def __init__(self, queryset, ordering=("-created_at", "-id"), per_page=24):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.keys = [
+            (name.lstrip("-"), name.startswith("-")) for name in self.ordering
+        ]
+
+    def page(self, cursor=None) -> KeysetPage:
+        rows = list(self.page_queryset(cursor))
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[: self.per_page]
+            next_cursor = self.encode(rows[-1])
+        return KeysetPage(rows, next_cursor)
+
+    def page_queryset(self, cursor=None):
+        """The query behind :meth:`page`, with one extra row to detect a next page."""
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode(cursor)))
+        return queryset[: self.per_page + 1]
+
+    def _after(self, values):
+        """Build ``(k1, k2, ...) > (v1, v2, ...)`` in the ordering's direction."""
+        clauses = []
+        for i, (name, descending) in enumerate(self.keys):
+            lookup = f"{name}__lt" if descending else f"{name}__gt"
+            equal = {key: value for (key, _), value in zip(self.keys[:i], values)}
+            clauses.append(Q(**equal, **{lookup: values[i]}))
+        return reduce(or_, clauses)
+
+    def encode(self, obj) -> str:
+        values = [getattr(obj, name) for name, _ in self.keys]
+        raw = json.dumps(values, cls=_CursorEncoder, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError):
+            raise InvalidCursor("Malformed pagination cursor.")
+        if not isinstance(values, list) or len(values) != len(self.keys):
+            raise InvalidCursor("Pagination cursor does not match this listing.")
+        return [self._parse(name, value) for (name, _), value in zip(self.keys, values)]
+
+    def _parse(self, name, value):
+        """Check a decoded value has its key's type; tampered cursors are rejected."""
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            field = None
+        if isinstance(field, models.DateTimeField):
+            try:
+                parsed = parse_datetime(value) if isinstance(value, str) else None
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                raise InvalidCursor("Malformed pagination cursor.")
+            return parsed
+        if isinstance(field, (models.IntegerField, models.AutoField)):
+            expected = (int,)
+        elif isinstance(field, (models.FloatField, models.DecimalField)) or field is None:
+            # Annotations (e.g. a search rank) round-trip as plain JSON numbers
+            expected = (int, float)
+        elif isinstance(field, (models.CharField, models.TextField)):
+            expected = (str,)
+        else:
+            expected = (str, int, float)
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise InvalidCursor("Malformed pagination cursor.")
+        return value
@@ -0,0 +1,52 @@
+"""Querysets for the hot pages, shared with the explain_hot_queries check."""
+
+from django.contrib.auth import get_user_model
+
+from .models import Order, Product, RatingReview
+
+CATALOG_ORDERING = ("-created_at", "-id")
+CATALOG_PAGE_SIZE = 24
+
+
+def catalog_products():
+    return Product.objects.filter(is_active=True)
+
+
+def featured_products(limit=6):
+    return catalog_products().select_related("seller").order_by("-created_at")[:limit]
+
+
+def map_sellers():
+    """Approved sellers that can be placed on the buyer dashboard map."""
+    return get_user_model().objects.filter(
+        user_type="seller",
+        is_approved=True,
+    ).exclude(latitude__isnull=True).exclude(longitude__isnull=True)
+
+
+def seller_products(seller):
+    return Product.objects.filter(seller=seller)
+
+
+def seller_orders(seller):
+    return Order.objects.filter(seller=seller).order_by("-created_at")
+
+
+def seller_reviews(seller):
+    return RatingReview.objects.filter(product__seller=seller)
+
+
+def buyer_orders(buyer):
+    return Order.objects.filter(buyer=buyer).select_related("seller").order_by("-created_at")
+
+
+def approved_reviews(product):
+    return RatingReview.objects.filter(product=product, is_approved=True)
+
+
+def pending_sellers():
+    return get_user_model().objects.filter(user_type="seller", is_approved=False)
+
+
+def pending_reviews():
+    return RatingReview.objects.filter(is_approved=False)
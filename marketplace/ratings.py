@@ -0,0 +1,80 @@
+"""
+Denormalized rating aggregates on Product.
+
+``Product.rating_sum``/``rating_count``/``rating_avg`` cover approved
+reviews only. Single-review changes adjust them by delta with ``F()``
+expressions (see the RatingReview signals); bulk changes that bypass
+signals, such as admin actions using ``queryset.update()``, call
+:func:`recalculate` for the affected products.
+"""
+
+from django.db.models import (
+    Avg,
+    Count,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from .models import Product, RatingReview
+
+
+def contribution(rating, is_approved):
+    """Return the ``(sum, count)`` a review adds to its product's aggregates."""
+    if is_approved:
+        return rating, 1
+    return 0, 0
+
+
+def apply_delta(product_id, rating_delta, count_delta, using="default"):
+    """Shift a product's rating aggregates by the given amounts in one UPDATE."""
+    if not rating_delta and not count_delta:
+        return
+    new_sum = F("rating_sum") + rating_delta
+    new_count = F("rating_count") + count_delta
+    Product.objects.using(using).filter(pk=product_id).update(
+        rating_sum=new_sum,
+        rating_count=new_count,
+        rating_avg=ExpressionWrapper(
+            Cast(new_sum, FloatField()) / Cast(NullIf(new_count, 0), FloatField()),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def recalculate(product_ids=None, using="default"):
+    """
+    Recompute aggregates from the reviews table for ``product_ids`` (or every
+    product when None) in a single UPDATE. Returns the number of products.
+    """
+    approved = (
+        RatingReview.objects.using(using)
+        .filter(product=OuterRef("pk"), is_approved=True)
+        .order_by()
+        .values("product")
+    )
+    products = Product.objects.using(using).all()
+    if product_ids is not None:
+        products = products.filter(pk__in=list(product_ids))
+    return products.update(
+        rating_sum=Coalesce(
+            Subquery(approved.annotate(total=Sum("rating")).values("total")),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+        rating_count=Coalesce(
+            Subquery(approved.annotate(total=Count("id")).values("total")),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+        rating_avg=Subquery(
+            approved.annotate(avg=Avg("rating")).values("avg"),
+            output_field=FloatField(),
+        ),
+    )
@@ -0,0 +1,218 @@
+"""
+Full-text product search.
+
+On SQLite the index is an FTS5 virtual table whose rowid mirrors
+``Product.id``; on PostgreSQL it is a weighted ``search_vector`` tsvector
+column on ``marketplace_product`` with a GIN index. Both are created by
+migration 0010 and kept in sync by the Product signals in ``signals.py``.
+Any other backend (or an SQLite build without FTS5) falls back to the
+original ``icontains`` scan.
+"""
+
+import re
+
+from django.db import DatabaseError, connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+
+FTS_TABLE = "marketplace_product_fts"
+PRODUCT_TABLE = "marketplace_product"
+TS_CONFIG = "english"
+
+# Cap the number of terms so a pasted paragraph can't build a huge query.
+MAX_TERMS = 8
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_PG_VECTOR_SQL = (
+    f"setweight(to_tsvector('{TS_CONFIG}', %s), 'A') || "
+    f"setweight(to_tsvector('{TS_CONFIG}', %s), 'B') || "
+    f"setweight(to_tsvector('{TS_CONFIG}', %s), 'C')"
+)
+
+_available = {}
+
+
+def install(connection):
+    """Create the search index structures for ``connection``'s backend."""
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                    "USING fts5(name, description, category, "
+                    "tokenize = 'porter unicode61')"
+                )
+            except DatabaseError:
+                # SQLite compiled without FTS5; searches use icontains.
+                return False
+    elif connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {PRODUCT_TABLE} "
+                "ADD COLUMN IF NOT EXISTS search_vector tsvector"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS marketplace_product_search_gin "
+                f"ON {PRODUCT_TABLE} USING GIN (search_vector)"
+            )
+    else:
+        return False
+    _available.pop(connection.alias, None)
+    return True
+
+
+def uninstall(connection):
+    """Drop the search index structures created by :func:`install`."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif connection.vendor == "postgresql":
+            cursor.execute("DROP INDEX IF EXISTS marketplace_product_search_gin")
+            cursor.execute(
+                f"ALTER TABLE {PRODUCT_TABLE} DROP COLUMN IF EXISTS search_vector"
+            )
+    _available.pop(connection.alias, None)
+
+
+def is_available(using="default"):
+    """Return True if the full-text index exists on the ``using`` database."""
+    if using not in _available:
+        connection = connections[using]
+        if connection.vendor == "sqlite":
+            _available[using] = FTS_TABLE in connection.introspection.table_names()
+        elif connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                columns = connection.introspection.get_table_description(
+                    cursor, PRODUCT_TABLE
+                )
+            _available[using] = any(c.name == "search_vector" for c in columns)
+        else:
+            _available[using] = False
+    return _available[using]
+
+
+def document_for(product):
+    """Return the ``(name, description, category)`` texts indexed for a product."""
+    categories = dict(product._meta.get_field("category").choices)
+    category = product.category or ""
+    label = categories.get(category, "")
+    return (
+        product.name or "",
+        product.description or "",
+        f"{category} {label}".strip(),
+    )
+
+
+def index_products(products, using="default"):
+    """Insert or refresh the index rows for ``products``."""
+    if not is_available(using):
+        return
+    connection = connections[using]
+    rows = [(product.pk, *document_for(product)) for product in products]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description, category) "
+                "VALUES (%s, %s, %s, %s)",
+                rows,
+            )
+        else:
+            cursor.executemany(
+                f"UPDATE {PRODUCT_TABLE} SET search_vector = {_PG_VECTOR_SQL} "
+                "WHERE id = %s",
+                [(*row[1:], row[0]) for row in rows],
+            )
+
+
+def remove_product(pk, using="default"):
+    """Drop a deleted product from the index."""
+    connection = connections[using]
+    # The tsvector column goes away with the row itself on PostgreSQL.
+    if connection.vendor == "sqlite" and is_available(using):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+
+
+def rebuild_index(model, using="default", batch_size=500):
+    """Re-index every row of ``model`` (the Product model or its migration state)."""
+    if not is_available(using):
+        return 0
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    count = 0
+    batch = []
+    for product in model._default_manager.using(using).iterator(chunk_size=batch_size):
+        batch.append(product)
+        if len(batch) >= batch_size:
+            index_products(batch, using)
+            count += len(batch)
+            batch = []
+    index_products(batch, using)
+    return count + len(batch)
+
+
+def _terms(query):
+    return _TOKEN_RE.findall(query.lower())[:MAX_TERMS]
+
+
+def search_products(queryset, query):
+    """
+    Filter ``queryset`` to products matching ``query`` and annotate each row
+    with ``search_rank`` (higher is better), ordered best match first.
+    """
+    terms = _terms(query)
+    if not terms:
+        return queryset.none()
+
+    using = queryset.db
+    if not is_available(using):
+        return queryset.filter(
+            Q(name__icontains=query)
+            | Q(description__icontains=query)
+            | Q(category__icontains=query)
+        ).annotate(search_rank=RawSQL("0", [], output_field=FloatField()))
+
+    vendor = connections[using].vendor
+    if vendor == "sqlite":
+        # Every term must match, each as a prefix so results appear while typing.
+        match = " ".join(f'"{term}"*' for term in terms)
+        queryset = queryset.filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, 10.0, 2.0, 1.0) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {PRODUCT_TABLE}.id",
+                [match],
+                output_field=FloatField(),
+            )
+        )
+    else:
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        queryset = queryset.filter(
+            id__in=RawSQL(
+                f"SELECT id FROM {PRODUCT_TABLE} "
+                f"WHERE search_vector @@ to_tsquery('{TS_CONFIG}', %s)",
+                [tsquery],
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"ts_rank({PRODUCT_TABLE}.search_vector, to_tsquery('{TS_CONFIG}', %s))",
+                [tsquery],
+                output_field=FloatField(),
+            )
+        )
+
+    return queryset.order_by("-search_rank", "-id")
@@ -0,0 +1,160 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import backends, fragments, images, inventory, jobs, ratings, search
+from .models import CustomUser, Order, Product, RatingReview
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, using="default", **kwargs):
+    """Keep the full-text index in step with the product row."""
+    if raw:
+        return
+    search.index_products([instance], using=using)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, using="default", **kwargs):
+    search.remove_product(instance.pk, using=using)
+
+
+@receiver(post_save, sender=Product)
+def refresh_image_variants(sender, instance, raw=False, **kwargs):
+    """Queue a new upload for checking and resizing; drop copies of a removed one."""
+    if raw or images.is_current(instance) or images.has_failed(instance):
+        return
+    if instance.image:
+        jobs.enqueue("images.process_upload", {"product_id": instance.pk}, unique=True)
+    elif instance.image_variants:
+        images.refresh_product(instance)
+
+
+@receiver(pre_delete, sender=Product)
+def delete_image_files(sender, instance, using="default", **kwargs):
+    """
+    Remove the product's resized copies (and, with reference-counted
+    storage, release its original) once the delete commits.
+    """
+    # Read what's stored: the background job may have updated the row
+    # since this instance was loaded.
+    stored = (
+        Product.objects.using(using)
+        .filter(pk=instance.pk)
+        .values("image", "image_variants")
+        .first()
+    )
+    if stored is None:
+        return
+    storage = instance._meta.get_field("image").storage
+
+    def delete_files():
+        images.delete_variants(stored["image_variants"], storage)
+        if stored["image"] and getattr(storage, "reference_counted", False):
+            storage.delete(stored["image"])
+
+    transaction.on_commit(delete_files, using=using)
+
+
+@receiver(pre_save, sender=Product)
+def remember_stored_image(sender, instance, raw=False, using="default", **kwargs):
+    """
+    Keep the stored image_variants and, with reference-counted storage,
+    note the image a save is replacing.
+    """
+    instance._replaced_image = None
+    if raw or instance.pk is None:
+        return
+    stored = (
+        Product.objects.using(using)
+        .filter(pk=instance.pk)
+        .values("image", "image_variants")
+        .first()
+    )
+    if stored is None:
+        return
+    # The background job writes image_variants; an instance loaded before it
+    # ran must not overwrite the copies it recorded.
+    instance.image_variants = stored["image_variants"]
+    storage = instance._meta.get_field("image").storage
+    if (
+        getattr(storage, "reference_counted", False)
+        and stored["image"]
+        and stored["image"] != instance.image.name
+    ):
+        instance._replaced_image = stored["image"]
+
+
+@receiver(post_save, sender=Product)
+def release_replaced_image(sender, instance, raw=False, **kwargs):
+    replaced = getattr(instance, "_replaced_image", None)
+    if replaced:
+        storage = instance._meta.get_field("image").storage
+        transaction.on_commit(lambda: storage.delete(replaced))
+
+
+@receiver(pre_save, sender=RatingReview)
+def remember_stored_review(sender, instance, raw=False, using="default", **kwargs):
+    """Record the review as currently stored so post_save can apply a delta."""
+    instance._stored_review = None
+    if raw or instance.pk is None:
+        return
+    instance._stored_review = (
+        RatingReview.objects.using(using)
+        .filter(pk=instance.pk)
+        .values_list("product_id", "rating", "is_approved")
+        .first()
+    )
+
+
+@receiver(post_save, sender=RatingReview)
+def update_product_rating(sender, instance, raw=False, using="default", **kwargs):
+    if raw:
+        return
+    new_sum, new_count = ratings.contribution(int(instance.rating), instance.is_approved)
+    stored = getattr(instance, "_stored_review", None)
+    if stored is None:
+        ratings.apply_delta(instance.product_id, new_sum, new_count, using=using)
+        return
+
+    old_product_id, old_rating, old_approved = stored
+    old_sum, old_count = ratings.contribution(old_rating, old_approved)
+    if old_product_id != instance.product_id:
+        ratings.apply_delta(old_product_id, -old_sum, -old_count, using=using)
+        ratings.apply_delta(instance.product_id, new_sum, new_count, using=using)
+    else:
+        ratings.apply_delta(
+            instance.product_id, new_sum - old_sum, new_count - old_count, using=using
+        )
+
+
+@receiver(post_delete, sender=RatingReview)
+def remove_product_rating(sender, instance, using="default", **kwargs):
+    old_sum, old_count = ratings.contribution(int(instance.rating), instance.is_approved)
+    ratings.apply_delta(instance.product_id, -old_sum, -old_count, using=using)
+
+
+@receiver(post_save, sender=Order)
+def settle_order_stock(sender, instance, raw=False, using="default", **kwargs):
+    """Release held stock once an order is delivered or cancelled."""
+    if raw:
+        return
+    inventory.settle_orders([instance], using=using)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def forget_cached_user(sender, instance, **kwargs):
+    """Drop the cached copy now and again after commit, so no request re-caches the old row."""
+    backends.forget_users([instance.pk])
+    transaction.on_commit(lambda: backends.forget_users([instance.pk]))
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_seller_cards(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Product cards show the seller's name, which isn't part of their cache key."""
+    if raw or not instance.is_seller:
+        return
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    fragments.invalidate_cards()
@@ -0,0 +1,379 @@
+"""
+Marketplace statistics shared by the staff dashboard and ``admin_tools``.
+
+Each table is summarised with a single grouped query using conditional
+aggregates (``Count(..., filter=Q(...))``), so the full set of dashboard
+numbers costs a handful of queries however many counters are shown.
+Per-month order counts come from the DailyMarketStats rollup, with only
+the days it does not cover yet read from live rows.
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import cached_property
+
+from django.db import transaction
+from django.db.models import Avg, Count, DateField, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils.timezone import localdate, make_aware, now
+
+from .models import (
+    CartItem,
+    CustomUser,
+    DailyMarketStats,
+    Order,
+    OrderItem,
+    Product,
+    RatingReview,
+)
+
+
+ORDER_STATUSES = ("pending", "confirmed", "shipped", "delivered", "cancelled")
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def previous_month_start(day):
+    return month_start(month_start(day) - timedelta(days=1))
+
+
+def start_of_day(day):
+    """Aware local midnight, so date filters stay index-friendly range scans."""
+    return make_aware(datetime.combine(day, time.min))
+
+
+def add_months(day, months):
+    """Shift the first-of-month ``day`` by whole calendar months."""
+    index = day.year * 12 + (day.month - 1) + months
+    return day.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+GRANULARITIES = {
+    "day": TruncDate,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+
+def bucket_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return month_start(day)
+    return day
+
+
+def bucket_starts(start, end, granularity):
+    """Every bucket start from the one containing ``start`` up to ``end`` inclusive."""
+    current = bucket_start(start, granularity)
+    buckets = []
+    while current <= end:
+        buckets.append(current)
+        if granularity == "week":
+            current += timedelta(days=7)
+        elif granularity == "month":
+            current = add_months(current, 1)
+        else:
+            current += timedelta(days=1)
+    return buckets
+
+
+def time_series(queryset, field, start, end, granularity="day", **aggregates):
+    """
+    Group ``queryset`` into calendar buckets of ``field`` between the dates
+    ``start`` and ``end`` (inclusive) in one query. Returns one dict per
+    bucket, with missing buckets zero-filled. Defaults to a row count.
+    """
+    aggregates = aggregates or {"count": Count("id")}
+    trunc = GRANULARITIES[granularity]
+    buckets = bucket_starts(start, end, granularity)
+    rows = (
+        queryset.filter(
+            **{
+                f"{field}__gte": start_of_day(buckets[0]),
+                f"{field}__lt": start_of_day(end + timedelta(days=1)),
+            }
+        )
+        .annotate(bucket=trunc(field, output_field=DateField()))
+        .order_by()
+        .values("bucket")
+        .annotate(**aggregates)
+    )
+    found = {row.pop("bucket"): row for row in rows}
+    empty = {name: 0 for name in aggregates}
+    return [{"bucket": bucket, **found.get(bucket, empty)} for bucket in buckets]
+
+
+class DashboardStats:
+    """Lazily computed counters, one query per table on first access."""
+
+    def __init__(self, today=None):
+        self.today = today or localdate()
+        self.this_month_start = month_start(self.today)
+        self.last_month_start = previous_month_start(self.today)
+
+    @cached_property
+    def users(self):
+        sellers = Q(user_type="seller")
+        return CustomUser.objects.aggregate(
+            total=Count("id"),
+            buyers=Count("id", filter=Q(user_type="buyer")),
+            sellers=Count("id", filter=sellers),
+            approved_sellers=Count("id", filter=sellers & Q(is_approved=True)),
+            pending_sellers=Count("id", filter=sellers & Q(is_approved=False)),
+        )
+
+    @cached_property
+    def products(self):
+        return Product.objects.aggregate(
+            total=Count("id"),
+            active=Count("id", filter=Q(is_active=True)),
+            inactive=Count("id", filter=Q(is_active=False)),
+        )
+
+    @cached_property
+    def orders(self):
+        # Status values are stored in both cases (the seller form writes
+        # "delivered", the admin actions "DELIVERED"), so match case-insensitively.
+        stats = Order.objects.aggregate(
+            total=Count("id"),
+            revenue=Sum("total_amount", filter=Q(status__iexact="delivered")),
+            **{
+                status: Count("id", filter=Q(status__iexact=status))
+                for status in ORDER_STATUSES
+            },
+        )
+        stats["revenue"] = stats["revenue"] or Decimal("0")
+        return stats
+
+    @cached_property
+    def monthly(self):
+        """
+        Orders placed, and their value, in this and last calendar month.
+        The value covers every order placed (the rollup's ``revenue``); a
+        status filter can't be rolled up because statuses change later.
+        """
+        orders = order_series(self.last_month_start, self.today, "month")
+        value = order_value_series(self.last_month_start, self.today, "month")
+        return {
+            "orders_last_month": orders[0]["count"],
+            "orders_this_month": orders[-1]["count"],
+            "order_value_last_month": value[0]["count"],
+            "order_value_this_month": value[-1]["count"],
+        }
+
+    @cached_property
+    def reviews(self):
+        stats = RatingReview.objects.aggregate(
+            total=Count("id"),
+            approved=Count("id", filter=Q(is_approved=True)),
+            pending=Count("id", filter=Q(is_approved=False)),
+            average_rating=Avg("rating", filter=Q(is_approved=True)),
+        )
+        stats["average_rating"] = stats["average_rating"] or 0
+        return stats
+
+    @cached_property
+    def carts(self):
+        return CartItem.objects.aggregate(
+            active=Count("buyer", distinct=True),
+            items=Count("id"),
+        )
+
+    def as_context(self):
+        """Flatten the counters into the names the dashboard template uses."""
+        users, products, orders, monthly = self.users, self.products, self.orders, self.monthly
+        return {
+            "total_users": users["total"],
+            "total_sellers": users["sellers"],
+            "total_buyers": users["buyers"],
+            "approved_sellers": users["approved_sellers"],
+            "pending_sellers": users["pending_sellers"],
+            "seller_approval_rate": _percent(users["approved_sellers"], users["sellers"]),
+            "total_products": products["total"],
+            "active_products": products["active"],
+            "inactive_products": products["inactive"],
+            "product_activation_rate": _percent(products["active"], products["total"]),
+            "total_orders": orders["total"],
+            "orders_this_month": monthly["orders_this_month"],
+            "orders_last_month": monthly["orders_last_month"],
+            "order_growth": _percent(
+                monthly["orders_this_month"] - monthly["orders_last_month"],
+                monthly["orders_last_month"],
+            ),
+            "total_revenue": orders["revenue"],
+            "order_value_this_month": monthly["order_value_this_month"],
+            "avg_order_value": (
+                orders["revenue"] / orders["total"] if orders["total"] else 0
+            ),
+            "pending_reviews": self.reviews["pending"],
+            "active_carts": self.carts["active"],
+            "total_cart_items": self.carts["items"],
+        }
+
+
+def rollup_watermark():
+    """The last rolled-up date; that day may be partial so it is redone next run."""
+    return DailyMarketStats.objects.aggregate(last=Max("date"))["last"]
+
+
+def first_activity_date():
+    """Earliest day with any order, user or review, or None on an empty site."""
+    dates = [
+        Order.objects.aggregate(first=Min("created_at"))["first"],
+        CustomUser.objects.aggregate(first=Min("date_joined"))["first"],
+        RatingReview.objects.aggregate(first=Min("created_at"))["first"],
+    ]
+    dates = [localdate(value) for value in dates if value is not None]
+    return min(dates) if dates else None
+
+
+def _by_day(queryset, field, start, end, *group_by, **aggregates):
+    return (
+        queryset.filter(
+            **{
+                f"{field}__gte": start_of_day(start),
+                f"{field}__lt": start_of_day(end + timedelta(days=1)),
+            }
+        )
+        .annotate(day=TruncDate(field))
+        .order_by()
+        .values("day", *group_by)
+        .annotate(**aggregates)
+    )
+
+
+def rollup_days(start, end):
+    """
+    Recompute DailyMarketStats for every day from ``start`` to ``end``
+    inclusive with four grouped queries and one bulk upsert. Re-running over
+    the same days rewrites the same rows. Returns the number of days written.
+    """
+    days = {
+        start + timedelta(days=offset): {
+            "orders": 0,
+            "revenue": Decimal("0"),
+            "new_buyers": 0,
+            "new_sellers": 0,
+            "new_reviews": 0,
+            "category_counts": {},
+        }
+        for offset in range((end - start).days + 1)
+    }
+
+    for row in _by_day(
+        Order.objects.all(), "created_at", start, end,
+        orders=Count("id"), revenue=Sum("total_amount"),
+    ):
+        days[row["day"]].update(orders=row["orders"], revenue=row["revenue"] or 0)
+
+    for row in _by_day(
+        CustomUser.objects.all(), "date_joined", start, end, "user_type",
+        joined=Count("id"),
+    ):
+        key = "new_sellers" if row["user_type"] == "seller" else "new_buyers"
+        days[row["day"]][key] += row["joined"]
+
+    for row in _by_day(
+        RatingReview.objects.all(), "created_at", start, end,
+        reviews=Count("id"),
+    ):
+        days[row["day"]]["new_reviews"] = row["reviews"]
+
+    for row in _by_day(
+        OrderItem.objects.all(), "order__created_at", start, end, "product__category",
+        units=Sum("quantity"),
+    ):
+        days[row["day"]]["category_counts"][row["product__category"]] = row["units"]
+
+    computed_at = now()
+    rows = [
+        DailyMarketStats(date=day, computed_at=computed_at, **values)
+        for day, values in days.items()
+    ]
+    with transaction.atomic():
+        DailyMarketStats.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["date"],
+            update_fields=[
+                "orders", "revenue", "new_buyers", "new_sellers",
+                "new_reviews", "category_counts", "computed_at",
+            ],
+        )
+    return len(rows)
+
+
+def rolled_up_series(start, end, granularity, metric, live):
+    """
+    Bucket a daily metric between ``start`` and ``end``, reading complete
+    DailyMarketStats rows and asking ``live(first_day, end)`` (which returns
+    ``{date: value}``) only for the runs of days not yet rolled up.
+    """
+    start = bucket_start(start, granularity)
+    complete = {
+        row.date: metric(row)
+        for row in DailyMarketStats.objects.filter(date__range=(start, end))
+        if row.is_complete
+    }
+    missing = [
+        start + timedelta(days=offset)
+        for offset in range((end - start).days + 1)
+        if start + timedelta(days=offset) not in complete
+    ]
+    values = dict(complete)
+    # Query each contiguous gap separately (typically the days before the
+    # first rollup and those since the watermark) so rolled-up days are skipped.
+    runs = []
+    for day in missing:
+        if runs and runs[-1][1] + timedelta(days=1) == day:
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    for first, last in runs:
+        live_values = live(first, last)
+        for offset in range((last - first).days + 1):
+            day = first + timedelta(days=offset)
+            values[day] = live_values.get(day, 0)
+
+    totals = {bucket: 0 for bucket in bucket_starts(start, end, granularity)}
+    for day, value in values.items():
+        totals[bucket_start(day, granularity)] += value
+    return [{"bucket": bucket, "count": count} for bucket, count in totals.items()]
+
+
+def order_series(start, end, granularity="day"):
+    """Orders placed per bucket, from the daily rollup plus live recent days."""
+    def live(first, last):
+        rows = time_series(Order.objects.all(), "created_at", first, last)
+        return {row["bucket"]: row["count"] for row in rows}
+
+    return rolled_up_series(start, end, granularity, lambda row: row.orders, live)
+
+
+def order_value_series(start, end, granularity="day"):
+    """Value of orders placed per bucket, from the daily rollup plus live recent days."""
+    def live(first, last):
+        rows = time_series(
+            Order.objects.all(), "created_at", first, last, total=Sum("total_amount")
+        )
+        return {row["bucket"]: row["total"] or 0 for row in rows}
+
+    return rolled_up_series(start, end, granularity, lambda row: row.revenue, live)
+
+
+def signup_series(start, end, granularity="month"):
+    """New users per bucket, from the daily rollup plus live recent days."""
+    def live(first, last):
+        rows = time_series(CustomUser.objects.all(), "date_joined", first, last)
+        return {row["bucket"]: row["count"] for row in rows}
+
+    return rolled_up_series(
+        start, end, granularity, lambda row: row.new_buyers + row.new_sellers, live
+    )
+
+
+def _percent(part, whole):
+    return (part / whole * 100) if whole else 0
@@ -0,0 +1,19 @@
+from django import template
+from django.utils.html import format_html
+
+from marketplace import idempotency
+
+register = template.Library()
+
+
+@register.simple_tag
+def idempotency_key():
+    """
+    Hidden one-off token for checkout forms, so a double submit is only
+    processed once
+    """
+    return format_html(
+        '<input type="hidden" name="{}" value="{}">',
+        idempotency.FORM_FIELD,
+        idempotency.new_key(),
+    )
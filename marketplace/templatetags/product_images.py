@@ -1,6 +1,10 @@
 from django import template
 from django.templatetags.static import static
 from django.conf import settings
+from django.urls import reverse
+from django.utils.html import format_html
+
+from marketplace import fragments, images
 
 register = template.Library()
 
@@ -81,3 +85,87 @@ def debug_product_image(product):
         debug_info['is_valid_url'] = debug_info['is_media_url']
     
     return debug_info
+
+@register.filter
+def image_at_width(product, width):
+    """
+    URL of a resized copy of the product image at least ``width`` pixels
+    wide, falling back to the original upload.
+    """
+    return product.image_variant_url(int(width))
+
+
+CARD_SIZES = "(min-width: 992px) 33vw, (min-width: 768px) 50vw, 100vw"
+
+
+@register.simple_tag
+def responsive_product_image(product, sizes=CARD_SIZES, css_class='', alt_text=''):
+    """
+    A <picture> with WebP and JPEG srcsets, intrinsic width/height and the
+    image's average colour as a placeholder, built from the stored
+    ``image_variants`` without touching storage. Products whose copies
+    aren't generated yet point at the on-demand variant view instead, and
+    those that can't be processed use the original.
+    """
+    alt_text = alt_text or product.name
+    if not product.image:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy">',
+            static('img/product-placeholder.jpg'), alt_text, css_class,
+        )
+    if images.has_failed(product):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy">',
+            product.image.url, alt_text, css_class,
+        )
+
+    metadata = product.image_variants
+    if images.is_current(product):
+        storage = product.image.storage
+        srcsets = {
+            fmt: ", ".join(
+                f"{storage.url(name)} {width}w"
+                for width, name in sorted(names.items(), key=lambda item: int(item[0]))
+            )
+            for fmt, names in metadata["variants"].items()
+        }
+        fallback = product.image_variant_url(640)
+        dimensions = format_html(
+            ' width="{}" height="{}" style="background-color: {};"',
+            metadata["width"], metadata["height"], metadata.get("color", "#e9ecef"),
+        )
+    else:
+        srcsets = {
+            fmt: ", ".join(
+                f"{reverse('product_image_variant', args=[product.pk, width, fmt])} {width}w"
+                for width in images.VARIANT_WIDTHS
+            )
+            for fmt in images.FORMATS
+        }
+        fallback = product.image.url
+        dimensions = format_html(' style="background-color: {};"', "#e9ecef")
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}"{} loading="lazy" decoding="async">'
+        '</picture>',
+        srcsets["webp"], sizes, fallback, srcsets["jpeg"], sizes, alt_text, css_class, dimensions,
+    )
+
+
+@register.simple_tag
+def product_card_timeout():
+    """Lifetime for ``{% cache %}`` around product cards."""
+    return fragments.card_timeout()
+
+
+@register.simple_tag(takes_context=True)
+def product_card_key(context, product):
+    """
+    Cache key for a product card fragment, for use with ``{% cache %}``.
+    The global card version is looked up once per template render.
+    """
+    version = context.render_context.get('product_card_version')
+    if version is None:
+        version = context.render_context['product_card_version'] = fragments.card_version()
+    return fragments.card_key(product, version)
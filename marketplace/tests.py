@@ -0,0 +1,101 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from .models import CustomUser, Order, Product, RatingReview
+
+
+class HotQueryIndexTests(TestCase):
+    """The hot marketplace queries must keep using the Meta.indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = CustomUser.objects.create_user(
+            email="seller@example.com", password="pw", user_type="seller",
+            is_approved=True, full_name="Seller",
+        )
+        cls.buyer = CustomUser.objects.create_user(
+            email="buyer@example.com", password="pw", user_type="buyer",
+            is_approved=True, full_name="Buyer",
+        )
+        cls.product = Product.objects.create(
+            seller=cls.seller, name="Rice", description="Milled rice", price=Decimal("50"),
+        )
+        Product.objects.create(
+            seller=cls.seller, name="Corn", description="Sweet corn", price=Decimal("30"),
+            is_active=False,
+        )
+        for status in ("pending", "delivered"):
+            Order.objects.create(
+                buyer=cls.buyer, seller=cls.seller, total_amount=Decimal("50"),
+                shipping_address="Somewhere", status=status,
+            )
+        RatingReview.objects.create(
+            product=cls.product, buyer=cls.buyer, rating=5, comment="Good", is_approved=True,
+        )
+
+    def test_hot_queries_use_indexes(self):
+        # Raises CommandError naming the queries that scan a whole table
+        call_command(
+            "explain_hot_queries",
+            user_id=self.seller.pk,
+            product_id=self.product.pk,
+            fail_on_scan=True,
+            stdout=StringIO(),
+        )
+
+
+@skipUnless(connection.vendor == "postgresql", "the connection pool needs PostgreSQL")
+class ConnectionPoolTests(SimpleTestCase):
+    """kaumahan.postgresql_pool hands a returned connection to the next user."""
+
+    databases = {"default"}
+
+    def setUp(self):
+        from kaumahan.postgresql_pool.base import DatabaseWrapper, _pools
+
+        settings_dict = {
+            **connection.settings_dict,
+            "ENGINE": "kaumahan.postgresql_pool",
+            "CONN_MAX_AGE": 0,
+            "POOL_SIZE": 2,
+        }
+        self.wrapper = DatabaseWrapper(settings_dict, alias="pool_test")
+        self.pool = self.wrapper._get_pool()
+        self.addCleanup(self._drain, _pools)
+
+    def _drain(self, pools):
+        self.wrapper.close()
+        while not self.pool.empty():
+            self.pool.get_nowait()[0].close()
+        pools.clear()
+
+    def test_checkout_return_reuse(self):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        first = self.wrapper.connection
+        self.wrapper.close()
+        self.assertIsNone(self.wrapper.connection)
+        self.assertFalse(first.closed)
+        self.assertEqual(self.pool.qsize(), 1)
+
+        with self.wrapper.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            self.assertEqual(cursor.fetchone(), (1,))
+        self.assertIs(self.wrapper.connection, first)
+        self.assertEqual(self.pool.qsize(), 0)
+
+    def test_close_inside_atomic_is_not_pooled(self):
+        self.wrapper.ensure_connection()
+        raw = self.wrapper.connection
+        self.wrapper.in_atomic_block = True
+        try:
+            self.wrapper.close()
+        finally:
+            self.wrapper.in_atomic_block = False
+        self.assertTrue(raw.closed)
+        self.assertEqual(self.pool.qsize(), 0)
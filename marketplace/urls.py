@@ -13,12 +13,14 @@ urlpatterns = [
     path("dashboard/", views.dashboard_redirect, name="dashboard"),
 
     path("buyer/", views.buyer_dashboard, name="buyer_dashboard"),
+    path("buyer/products/", views.buyer_catalog_page, name="buyer_catalog_page"),
     path("seller/", views.seller_dashboard, name="seller_dashboard"),
     path("admin-panel/", views.admin_dashboard, name="admin_dashboard"),
 
     # Admin dashboard URLs
     path("admin-dashboard/", admin_views.admin_dashboard, name="enhanced_admin_dashboard"),
     path("admin/chart-data/", admin_views.admin_chart_data, name="admin_chart_data"),
+    path("admin/request-stats/", admin_views.admin_request_stats, name="admin_request_stats"),
 
     path("cart/", views.cart_view, name="cart"),
     path("cart/add/<int:product_id>/", views.add_to_cart, name="add_to_cart"),
@@ -33,6 +35,7 @@ urlpatterns = [
     path("products/<int:pk>/edit/", views.product_update, name="product_update"),
     path("products/<int:pk>/delete/", views.product_delete, name="product_delete"),
     path("products/<int:pk>/", views.product_detail, name="product_detail"),
+    path("products/<int:pk>/image/<int:width>.<str:fmt>", views.product_image_variant, name="product_image_variant"),
 
     path("sellers/<int:user_id>/approve/", views.approve_seller, name="approve_seller"),
     path("sellers/<int:user_id>/reject/", views.reject_seller, name="reject_seller"),
@@ -1,13 +1,18 @@
+import uuid
+
 from django.contrib import messages
 from django.contrib.auth import get_user_model, login, logout
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Avg, Count
-from django.http import JsonResponse
+from django.db import connection, transaction
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render, reverse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
+from kaumahan.routers import reads_from_replica
+
+from . import idempotency, images, inventory, jobs, media, metrics, queries
 from .decorators import buyer_required, seller_required, staff_required
 from .forms import (
     CartAddForm,
@@ -18,6 +23,8 @@ from .forms import (
     RegistrationForm,
 )
 from .models import CartItem, Order, OrderItem, Product, RatingReview
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import search_products
 
 
 CustomUser = get_user_model()
@@ -79,21 +86,28 @@ def dashboard_redirect(request):
     return redirect(redirect_authenticated_user(request.user))
 
 
+def _catalog_page(request):
+    """Return the search query and current keyset page of the buyer catalog."""
+    query = request.GET.get("q", "").strip()
+    products = queries.catalog_products()
+    ordering = queries.CATALOG_ORDERING
+    if query:
+        products = search_products(products, query)
+        ordering = ("-search_rank", "-id")
+
+    paginator = KeysetPaginator(products, ordering=ordering, per_page=queries.CATALOG_PAGE_SIZE)
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidCursor:
+        raise Http404("Invalid page.")
+    return query, page
+
+
 @buyer_required
 def buyer_dashboard(request):
-    query = request.GET.get("q")
-    products = Product.objects.filter(is_active=True)
-    if query:
-        products = products.filter(
-            Q(name__icontains=query)
-            | Q(description__icontains=query)
-            | Q(category__icontains=query)
-        )
+    query, page = _catalog_page(request)
 
-    sellers = CustomUser.objects.filter(
-        user_type="seller",
-        is_approved=True,
-    ).exclude(latitude__isnull=True).exclude(longitude__isnull=True)
+    sellers = queries.map_sellers()
 
     cart_items = CartItem.objects.filter(buyer=request.user)
     cart_total = sum(item.total_price for item in cart_items)
@@ -102,7 +116,9 @@ def buyer_dashboard(request):
         request,
         "dashboard/buyer_dashboard.html",
         {
-            "products": products,
+            "products": page.object_list,
+            "next_cursor": page.next_cursor,
+            "query": query,
             "sellers": sellers,
             "cart_items": cart_items,
             "cart_total": cart_total,
@@ -111,11 +127,25 @@ def buyer_dashboard(request):
     )
 
 
+@buyer_required
+def buyer_catalog_page(request):
+    """Product-card HTML for the next catalog page (infinite scroll)."""
+    query, page = _catalog_page(request)
+    response = render(
+        request,
+        "dashboard/includes/product_cards.html",
+        {"products": page.object_list},
+    )
+    response["X-Next-Cursor"] = page.next_cursor or ""
+    return response
+
+
 @seller_required
+@reads_from_replica
 def seller_dashboard(request):
-    products = Product.objects.filter(seller=request.user)
-    orders = Order.objects.filter(seller=request.user).order_by("-created_at")[:10]
-    reviews = RatingReview.objects.filter(product__seller=request.user)[:10]
+    products = queries.seller_products(request.user)
+    orders = queries.seller_orders(request.user)[:10]
+    reviews = queries.seller_reviews(request.user)[:10]
     return render(
         request,
         "dashboard/seller_dashboard.html",
@@ -128,6 +158,7 @@ def seller_dashboard(request):
 
 
 @staff_required
+@reads_from_replica
 def admin_dashboard(request):
     buyers = CustomUser.objects.filter(user_type="buyer")
     sellers = CustomUser.objects.filter(user_type="seller")
@@ -189,6 +220,7 @@ def checkout_direct(request, product_id):
         quantity = int(request.POST.get('quantity', 1))
         
         if quantity < 1:
+            metrics.CHECKOUTS.inc(flow="direct", outcome="invalid")
             messages.error(request, "Invalid quantity.")
             return redirect("product_detail", pk=product_id)
         
@@ -197,35 +229,127 @@ def checkout_direct(request, product_id):
         if not seller:
             seller = get_user_model().objects.filter(is_staff=True).first()
             if not seller:
+                metrics.CHECKOUTS.inc(flow="direct", outcome="invalid")
                 messages.error(request, "No seller found for this product.")
                 return redirect("product_detail", pk=product_id)
         
-        # Create a new order
-        order = Order.objects.create(
-            buyer=request.user,
-            seller=seller,
-            shipping_address=getattr(request.user, 'address', 'Please update your address in profile'),
-            payment_method="cod",
-            total_amount=product.price * quantity,
-            status="pending"
-        )
+        key = idempotency.key_from_request(request)
+        previous = idempotency.replay(request.user, key)
+        if previous:
+            metrics.CHECKOUTS.inc(flow="direct", outcome="replayed")
+            messages.info(request, "This order was already placed.")
+            return redirect(previous)
         
-        # Create order item
-        OrderItem.objects.create(
-            order=order,
-            product=product,
-            quantity=quantity,
-            price=product.price
-        )
+        with transaction.atomic():
+            claimed = idempotency.claim(request.user, key, "checkout_direct")
+            
+            # Take the units out of stock before writing the order
+            inventory.reserve([(product, quantity)])
+            
+            # Create a new order
+            order = Order.objects.create(
+                buyer=request.user,
+                seller=seller,
+                shipping_address=getattr(request.user, 'address', 'Please update your address in profile'),
+                payment_method="cod",
+                total_amount=product.price * quantity,
+                status="pending"
+            )
+            
+            # Create order item
+            OrderItem.objects.create(
+                order=order,
+                product=product,
+                quantity=quantity,
+                price=product.price,
+                stock_reserved=True
+            )
+            
+            next_url = reverse("checkout_order", args=[order.id])
+            idempotency.complete(claimed, next_url)
         
+        metrics.CHECKOUTS.inc(flow="direct", outcome="placed")
         messages.success(request, "Your order has been created. Please complete the checkout process.")
-        return redirect("checkout_order", order_id=order.id)
+        return redirect(next_url)
         
+    except idempotency.DuplicateRequest:
+        # A concurrent submit with the same key got there first
+        metrics.CHECKOUTS.inc(flow="direct", outcome="duplicate")
+        return _replay_or_retry(request, key, redirect("product_detail", pk=product_id))
+    except inventory.StockError as e:
+        metrics.CHECKOUTS.inc(flow="direct", outcome=_stock_outcome(e))
+        messages.error(request, str(e))
+        return redirect("product_detail", pk=product_id)
     except Exception as e:
+        metrics.CHECKOUTS.inc(flow="direct", outcome="error")
         messages.error(request, f"An error occurred: {str(e)}")
         return redirect("product_detail", pk=product_id)
 
 
+def _stock_outcome(error):
+    return "out_of_stock" if isinstance(error, inventory.OutOfStock) else "contention"
+
+
+def _replay_or_retry(request, key, fallback):
+    previous = idempotency.replay(request.user, key)
+    if previous:
+        messages.info(request, "This order was already placed.")
+        return redirect(previous)
+    messages.error(request, "Your order is still being processed. Please check your orders before trying again.")
+    return fallback
+
+
+def _place_cart_orders(buyer, cart_items, shipping_address, payment_method, key=None):
+    """
+    Turn cart lines into one order per seller, so seller-side queries stay
+    simple lookups on seller_id. Stock, orders, items, the cart clear and
+    the idempotency key succeed or fail together. Returns the shared group
+    id and the orders.
+    """
+    lines_by_seller = {}
+    for item in cart_items:
+        lines_by_seller.setdefault(item.product.seller_id, []).append(item)
+    group_id = uuid.uuid4()
+
+    with transaction.atomic():
+        claimed = idempotency.claim(buyer, key, "checkout")
+        inventory.reserve((item.product, item.quantity) for item in cart_items)
+
+        orders = [
+            Order(
+                buyer=buyer,
+                seller_id=seller_id,
+                group_id=group_id,
+                shipping_address=shipping_address,
+                payment_method=payment_method,
+                total_amount=sum(item.total_price for item in lines),
+                status="pending",
+            )
+            for seller_id, lines in lines_by_seller.items()
+        ]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Order.objects.bulk_create(orders)
+        else:
+            # SQLite before 3.35 can't report the new primary keys
+            for order in orders:
+                order.save()
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=item.product,
+                quantity=item.quantity,
+                price=item.product.price,
+                stock_reserved=True,
+            )
+            for order, lines in zip(orders, lines_by_seller.values())
+            for item in lines
+        ])
+        # Only clear the lines that were ordered
+        CartItem.objects.filter(pk__in=[item.pk for item in cart_items]).delete()
+        idempotency.complete(claimed, f"{reverse('buyer_orders')}?group={group_id}")
+    return group_id, orders
+
+
 @login_required
 @buyer_required
 def checkout_view(request, order_id=None):
@@ -247,41 +371,59 @@ def checkout_view(request, order_id=None):
             messages.success(request, 'Your order has been placed successfully!')
             return redirect('buyer_orders')
     else:
-        # Handle cart checkout
-        cart_items = CartItem.objects.filter(buyer=request.user)
+        # Handle cart checkout; one query loads every line with its product
+        cart_items = list(
+            CartItem.objects.filter(buyer=request.user).select_related('product')
+        )
         cart_total = sum(item.total_price for item in cart_items)
         
         if request.method == 'POST':
             shipping_address = request.POST.get('shipping_address')
             payment_method = request.POST.get('payment_method', 'cod')
             
+            key = idempotency.key_from_request(request)
+            
+            # A resubmitted checkout finds the cart already cleared, so check
+            # for a replay before validating the cart
+            previous = idempotency.replay(request.user, key)
+            if previous:
+                metrics.CHECKOUTS.inc(flow="cart", outcome="replayed")
+                messages.info(request, 'This order was already placed.')
+                return redirect(previous)
             if not shipping_address:
+                metrics.CHECKOUTS.inc(flow="cart", outcome="invalid")
                 messages.error(request, 'Please provide a shipping address')
                 return redirect('checkout')
+            if not cart_items:
+                metrics.CHECKOUTS.inc(flow="cart", outcome="invalid")
+                messages.error(request, 'Your cart is empty')
+                return redirect('cart')
             
-            # Create order
-            order = Order.objects.create(
-                buyer=request.user,
-                shipping_address=shipping_address,
-                payment_method=payment_method,
-                total_amount=cart_total,
-                status='pending'
-            )
-            
-            # Create order items
-            for item in cart_items:
-                OrderItem.objects.create(
-                    order=order,
-                    product=item.product,
-                    quantity=item.quantity,
-                    price=item.product.price
+            try:
+                group_id, orders = _place_cart_orders(
+                    request.user, cart_items, shipping_address, payment_method, key
                 )
+            except idempotency.DuplicateRequest:
+                metrics.CHECKOUTS.inc(flow="cart", outcome="duplicate")
+                return _replay_or_retry(request, key, redirect('buyer_orders'))
+            except inventory.StockError as e:
+                metrics.CHECKOUTS.inc(flow="cart", outcome=_stock_outcome(e))
+                messages.error(request, str(e))
+                return redirect('cart')
+            except Exception:
+                metrics.CHECKOUTS.inc(flow="cart", outcome="error")
+                raise
+            metrics.CHECKOUTS.inc(flow="cart", outcome="placed")
             
-            # Clear cart
-            cart_items.delete()
-            
-            messages.success(request, 'Your order has been placed successfully!')
-            return redirect('buyer_orders')
+            if len(orders) > 1:
+                messages.success(
+                    request,
+                    f'Your order has been placed successfully! It was split into '
+                    f'{len(orders)} orders, one per seller.'
+                )
+            else:
+                messages.success(request, 'Your order has been placed successfully!')
+            return redirect(f"{reverse('buyer_orders')}?group={group_id}")
     
     context = {
         'order': order,
@@ -299,14 +441,27 @@ def checkout_view(request, order_id=None):
 
 
 @buyer_required
+@reads_from_replica
 def buyer_orders(request):
-    orders = Order.objects.filter(buyer=request.user).order_by("-created_at")
-    return render(request, "orders/order_history.html", {"orders": orders})
+    orders = queries.buyer_orders(request.user)
+    group_id = None
+    if request.GET.get("group"):
+        try:
+            group_id = uuid.UUID(request.GET["group"])
+        except ValueError:
+            raise Http404("Unknown order group.")
+        orders = orders.filter(group_id=group_id)
+    return render(
+        request,
+        "orders/order_history.html",
+        {"orders": orders, "group_id": group_id},
+    )
 
 
 @seller_required
+@reads_from_replica
 def seller_orders(request):
-    orders = Order.objects.filter(seller=request.user).order_by("-created_at")
+    orders = queries.seller_orders(request.user)
     if request.method == "POST":
         order = get_object_or_404(orders, pk=request.POST.get("order_id"))
         form = OrderStatusForm(request.POST, instance=order)
@@ -363,7 +518,7 @@ def product_delete(request, pk):
 @login_required
 def product_detail(request, pk):
     product = get_object_or_404(Product, pk=pk, is_active=True)
-    reviews = product.reviews.filter(is_approved=True)
+    reviews = queries.approved_reviews(product)
     form = None
     if request.user.is_authenticated and getattr(request.user, "is_buyer", False):
         try:
@@ -405,14 +560,14 @@ def rate_product(request):
             defaults={'rating': rating}
         )
         
-        # Calculate new average rating
+        # Read the aggregates the rating signals just updated
         product = get_object_or_404(Product, id=product_id)
-        avg_rating = product.reviews.aggregate(avg=Avg('rating'))['avg'] or 0
+        avg_rating = product.rating_avg or 0
         
         return JsonResponse({
             'status': 'success',
-            'avg_rating': round(avg_rating, 1),
-            'rating_count': product.reviews.count()
+            'avg_rating': float(round(avg_rating, 1)),
+            'rating_count': product.rating_count
         })
     
     return JsonResponse({'status': 'error', 'message': 'Invalid form data'}, status=400)
@@ -439,43 +594,35 @@ def reject_seller(request, user_id):
 
 def custom_media_serve(request, path):
     """
-    Custom media serving view that works on Render and other production platforms
+    Stream an uploaded file from MEDIA_ROOT, with Range support for video
+    seeking and optional X-Sendfile/X-Accel-Redirect offload
     """
-    import os
-    from django.conf import settings
-    from django.http import HttpResponse, Http404
-    from mimetypes import guess_type
-    
-    print(f"DEBUG: custom_media_serve called with path: {path}")
-    print(f"DEBUG: MEDIA_ROOT: {settings.MEDIA_ROOT}")
-    
-    # Security check - prevent directory traversal
-    if '..' in path or path.startswith('/'):
-        print(f"DEBUG: Security check failed for path: {path}")
-        raise Http404("File not found")
-    
-    # Construct the full file path
-    file_path = os.path.join(settings.MEDIA_ROOT, path)
-    print(f"DEBUG: Full file path: {file_path}")
-    
-    # Check if file exists
-    if not os.path.exists(file_path) or not os.path.isfile(file_path):
-        print(f"DEBUG: File not found at: {file_path}")
-        raise Http404("File not found")
-    
-    # Guess MIME type
-    mime_type, encoding = guess_type(file_path)
-    mime_type = mime_type or 'application/octet-stream'
-    print(f"DEBUG: MIME type: {mime_type}")
-    
-    # Serve the file
-    try:
-        with open(file_path, 'rb') as f:
-            content = f.read()
-            response = HttpResponse(content, content_type=mime_type)
-            response['Content-Disposition'] = f'inline; filename="{os.path.basename(file_path)}"'
-            print(f"DEBUG: Serving {len(content)} bytes")
-            return response
-    except Exception as e:
-        print(f"DEBUG: Error serving file: {e}")
-        raise Http404("File not found")
+    return media.serve(request, path)
+
+
+def product_image_variant(request, pk, width, fmt):
+    """
+    Redirect to a resized copy of a product's image. Until the copies exist
+    (a pending upload job, or a product uploaded before they did), queue the
+    job and redirect to the original instead. Images whose job gave up are
+    always served as the original.
+    """
+    if width not in images.VARIANT_WIDTHS or fmt not in images.FORMATS:
+        raise Http404("Unknown image size")
+    product = get_object_or_404(Product.objects.only("id", "image", "image_variants"), pk=pk)
+    if not product.image:
+        raise Http404("Product has no image")
+
+    if images.has_failed(product):
+        response = redirect(product.image.url)
+    elif not images.is_current(product):
+        jobs.enqueue("images.process_upload", {"product_id": product.pk}, unique=True)
+        response = redirect(product.image.url)
+        # Point at the copies again once the job has run
+        response["Cache-Control"] = "no-cache"
+        return response
+    else:
+        response = redirect(product.image_variant_url(width, fmt))
+    # The target changes whenever the image is replaced, so keep this short
+    response["Cache-Control"] = "public, max-age=300"
+    return response
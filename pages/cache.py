@@ -0,0 +1,68 @@
+"""
+Whole-page caching of the public pages for anonymous visitors, in
+groups that can be invalidated together.
+"""
+
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+
+from kaumahan.cache import versioned_timeout
+from marketplace import metrics
+
+
+def _version_key(group):
+    return f"pages:{group}:version"
+
+
+def group_version(group):
+    return cache.get_or_set(_version_key(group), 1, timeout=None)
+
+
+def invalidate(group):
+    """Make every cached page in ``group`` stale."""
+    try:
+        cache.incr(_version_key(group))
+    except ValueError:
+        # Not set yet (or evicted): nothing cached under the old version
+        cache.set(_version_key(group), 1, timeout=None)
+
+
+def cacheable(request):
+    return (
+        request.method in ("GET", "HEAD")
+        and not request.GET
+        and not request.user.is_authenticated
+        and not len(get_messages(request))
+    )
+
+
+def cache_for_anonymous(group="static", timeout=None):
+    """Cache a view's response for anonymous visitors, keyed by path and group version."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not cacheable(request):
+                return view(request, *args, **kwargs)
+
+            key = f"pages:{group}:{group_version(group)}:{request.get_host()}{request.path}"
+            response = cache.get(key)
+            metrics.CACHE_LOOKUPS.inc(cache="page", result="miss" if response is None else "hit")
+            if response is not None:
+                return response
+
+            response = view(request, *args, **kwargs)
+            # A page that issued a CSRF token or set cookies is per-visitor
+            if (
+                response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+            ):
+                seconds = getattr(settings, "PAGE_CACHE_SECONDS", 600) if timeout is None else timeout
+                cache.set(key, response, versioned_timeout(seconds))
+            return response
+        return wrapped
+    return decorator
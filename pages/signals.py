@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from marketplace.models import Product, RatingReview
+
+from . import cache
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=RatingReview)
+@receiver(post_delete, sender=RatingReview)
+def invalidate_catalog_pages(sender, raw=False, **kwargs):
+    """The home page lists featured products with their ratings."""
+    if raw:
+        return
+    cache.invalidate("catalog")
@@ -1,28 +1,33 @@
 from django.contrib import messages
 from django.shortcuts import redirect, render
 
-from marketplace.models import Product
+from marketplace.queries import featured_products
 
+from .cache import cache_for_anonymous
 from .forms import ContactForm
 
 
+@cache_for_anonymous("catalog")
 def home(request):
-    featured_products = Product.objects.filter(is_active=True).order_by("-created_at")[:6]
-    return render(request, "pages/home.html", {"featured_products": featured_products})
+    return render(request, "pages/home.html", {"featured_products": featured_products()})
 
 
+@cache_for_anonymous()
 def about(request):
     return render(request, "pages/about.html")
 
 
+@cache_for_anonymous()
 def faq(request):
     return render(request, "pages/faq.html")
 
 
+@cache_for_anonymous()
 def terms(request):
     return render(request, "pages/terms.html")
 
 
+@cache_for_anonymous()
 def privacy(request):
     return render(request, "pages/privacy.html")
 